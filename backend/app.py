@@ -2,27 +2,63 @@ from __future__ import annotations
 
 import logging
 import os
+import hashlib
+import json
 import uuid
-from datetime import date, datetime, timedelta
-from urllib.parse import quote_plus
+from datetime import date, datetime, timezone
+from typing import Callable
 
-import pandas as pd
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
 
-from services.categorize_service import categorize_transactions
-from services.coach_service import build_coach_response, get_gemini_runtime_status
-from services.csv_service import CSVParseError, parse_and_normalize_csv
-from services.recurring_service import detect_subscriptions
-from services.summary_service import build_summary
-from store import get_dataset, save_dataset
+from services.calendar_service import MAX_HORIZON, build_ics, cached_calendar_events
+from services.categorize_service import memo_stats
+from services.coach_service import (
+    build_coach_response,
+    coach_cache_stats,
+    get_gemini_runtime_status,
+    stream_coach_response,
+)
+from services.csv_service import CSVParseError, iter_normalized_csv, parse_and_normalize_csv
+from services.dataset_service import (
+    TRANSACTION_COLUMNS,
+    DatasetBuilder,
+    apply_transaction_changes,
+    dataset_calendar,
+    find_transaction_positions,
+    locate_transactions,
+    rebuild_dataset,
+    summarize_range,
+)
+from services.pagination_service import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, list_transactions_page
+from store import (
+    DatasetConflictError,
+    cache_stats,
+    dataset_write_lock,
+    get_dataset,
+    get_dataset_with_revision,
+    get_dataset_with_stamp,
+    save_dataset,
+    save_dataset_stream,
+)
 
 logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Query parameters that switch GET /transactions from the full list to pages.
+PAGE_QUERY_PARAMS = ("limit", "cursor", "fields", "order", "start", "end", "category", "q")
+
+# Uploads larger than this are ingested in chunks instead of being read whole.
+CSV_STREAM_THRESHOLD_BYTES = int(os.getenv("CSV_STREAM_THRESHOLD_BYTES", str(8 * 1024 * 1024)))
+
+REQUIRED_TRANSACTION_FIELDS = ("date", "description", "merchant", "amount")
+DUPLICATE_TX_ID_ERROR = "A transaction with this tx_id already exists."
+# Most operations accepted by one POST /transactions/batch request.
+BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", "10000"))
+
 allowed_origins = os.getenv(
     "CORS_ORIGINS",
     "http://localhost:5173,http://127.0.0.1:5173,https://lb1227.github.io",
@@ -48,99 +84,9 @@ def not_found(_: Exception):
 
 @app.route("/api/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"})
-
-
-def _coerce_transactions(rows: list[dict]) -> pd.DataFrame:
-    tx = pd.DataFrame(rows or [])
-    if tx.empty:
-        return pd.DataFrame(
-            columns=[
-                "tx_id",
-                "date",
-                "description",
-                "merchant",
-                "amount",
-                "category",
-                "source",
-                "interval_days",
-                "next_charge_date",
-            ]
-        )
-
-    required = [
-        "tx_id",
-        "date",
-        "description",
-        "merchant",
-        "amount",
-        "category",
-        "source",
-        "interval_days",
-        "next_charge_date",
-    ]
-    for col in required:
-        if col not in tx.columns:
-            if col == "amount":
-                tx[col] = 0.0
-            elif col == "interval_days":
-                tx[col] = 0
-            else:
-                tx[col] = ""
-
-    tx["amount"] = pd.to_numeric(tx["amount"], errors="coerce").fillna(0.0)
-    tx["tx_id"] = tx["tx_id"].astype(str)
-    tx.loc[tx["tx_id"].str.strip() == "", "tx_id"] = [str(uuid.uuid4()) for _ in range((tx["tx_id"].str.strip() == "").sum())]
-    tx["date"] = tx["date"].astype(str)
-    tx["description"] = tx["description"].astype(str)
-    tx["merchant"] = tx["merchant"].astype(str)
-    tx["category"] = tx["category"].astype(str)
-    tx["source"] = tx["source"].astype(str)
-    tx["interval_days"] = pd.to_numeric(tx["interval_days"], errors="coerce").fillna(0).astype(int)
-    tx["next_charge_date"] = tx["next_charge_date"].astype(str)
-    return tx[required]
-
-
-def _rebuild_dataset(transactions: list[dict], goals: dict | None = None, explicit_subscriptions: list[dict] | None = None) -> dict:
-    tx = _coerce_transactions(transactions)
-    categorized = categorize_transactions(tx)
-
-    manual_subscriptions = []
-    for transaction in categorized.to_dict(orient="records"):
-        is_manual_subscription = (
-            transaction.get("source") == "manual_subscription"
-            or str(transaction.get("category", "")).lower() == "subscription"
-        )
-        amount = float(transaction.get("amount", 0) or 0)
-        merchant = str(transaction.get("merchant", "") or "").strip()
-        if not is_manual_subscription or amount <= 0 or not merchant:
-            continue
-
-        interval_days = max(1, int(float(transaction.get("interval_days", 30) or 30)))
-        monthly_cost = round(amount * (30 / interval_days), 2)
-        manual_subscriptions.append(
-            {
-                "merchant": merchant,
-                "interval_days": interval_days,
-                "monthly_cost": monthly_cost,
-                "next_charge_date": transaction.get("next_charge_date") or transaction.get("date", ""),
-                "confidence": None,
-            }
-        )
-
-    # If the client provided explicit subscriptions (from manual entry), trust and use them.
-    if isinstance(explicit_subscriptions, list) and explicit_subscriptions:
-        subscriptions = [*explicit_subscriptions, *manual_subscriptions]
-    else:
-        subscriptions = [*detect_subscriptions(categorized), *manual_subscriptions]
-
-    summary = build_summary(categorized, subscriptions)
-    return {
-        "transactions": categorized.to_dict(orient="records"),
-        "subscriptions": subscriptions,
-        "summary": summary,
-        "goals": goals or {},
-    }
+    return jsonify(
+        {"status": "ok", "store_cache": cache_stats(), "category_memo": memo_stats(), "coach_cache": coach_cache_stats()}
+    )
 
 
 @app.route("/api/datasets/upload", methods=["POST"])
@@ -152,15 +98,20 @@ def upload_dataset():
     if not file.filename:
         return jsonify({"error": "No file selected."}), 400
 
+    dataset_id = str(uuid.uuid4())
+    content_length = request.content_length or 0
     try:
-        normalized = parse_and_normalize_csv(file.read())
+        if content_length > CSV_STREAM_THRESHOLD_BYTES:
+            # Large exports: parse, categorize and persist one chunk at a time.
+            builder = DatasetBuilder()
+            chunks = (builder.add(chunk.assign(source="csv")) for chunk in iter_normalized_csv(file.stream))
+            save_dataset_stream(dataset_id, chunks, builder.finish)
+        else:
+            normalized = parse_and_normalize_csv(file.read())
+            save_dataset(dataset_id, rebuild_dataset(normalized.assign(source="csv")))
     except CSVParseError as exc:
         return jsonify({"error": str(exc)}), 400
 
-    dataset_id = str(uuid.uuid4())
-    payload = _rebuild_dataset(normalized.assign(source="csv").to_dict(orient="records"))
-    save_dataset(dataset_id, payload)
-
     return jsonify({"dataset_id": dataset_id})
 
 
@@ -172,233 +123,350 @@ def create_manual_dataset():
         return jsonify({"error": "Body must include a transactions array."}), 400
 
     dataset_id = str(uuid.uuid4())
-    save_dataset(dataset_id, _rebuild_dataset(transactions, payload.get("goals"), payload.get("subscriptions")))
+    save_dataset(dataset_id, rebuild_dataset(transactions, payload.get("goals"), payload.get("subscriptions")))
     return jsonify({"dataset_id": dataset_id})
 
 
+class _NotFound(Exception):
+    """Raised by an edit when the record it targets doesn't exist."""
+
+
+class _DuplicateTransaction(Exception):
+    """Raised by an edit adding a transaction whose tx_id is already taken."""
+
+
+def _save_edit(dataset_id: str, edit: Callable[[dict], dict]) -> dict | None:
+    """Save ``edit(dataset)`` over the stored dataset; None if there is none.
+
+    The edit is computed without holding any lock and saved only if the
+    dataset is still at the revision it was computed from. If another
+    worker saved first, it is recomputed while holding the dataset's write
+    lock, where it cannot conflict again.
+    """
+    stored = get_dataset_with_revision(dataset_id)
+    if stored is None:
+        return None
+    dataset, revision = stored
+    updated = edit(dataset)
+    try:
+        save_dataset(dataset_id, updated, expected_revision=revision)
+        return updated
+    except DatasetConflictError:
+        logger.info("Dataset %s changed during an edit; retrying under its write lock", dataset_id)
+
+    with dataset_write_lock(dataset_id):
+        dataset = get_dataset(dataset_id)
+        if dataset is None:
+            return None
+        updated = edit(dataset)
+        save_dataset(dataset_id, updated)
+        return updated
+
+
 @app.route("/api/datasets/<dataset_id>/transactions", methods=["POST"])
 def add_transaction(dataset_id: str):
-    dataset = get_dataset(dataset_id)
-    if dataset is None:
-        return jsonify({"error": "Dataset not found."}), 404
-
     payload = request.get_json(silent=True) or {}
-    required = ["date", "description", "merchant", "amount"]
-    if any(field not in payload for field in required):
+    if any(field not in payload for field in REQUIRED_TRANSACTION_FIELDS):
         return jsonify({"error": "Body must include date, description, merchant, and amount."}), 400
 
+    if payload.get("tx_id") and not isinstance(payload["tx_id"], str):
+        return jsonify({"error": "tx_id must be a string."}), 400
+
     payload["tx_id"] = payload.get("tx_id") or str(uuid.uuid4())
     payload["source"] = payload.get("source") or "manual"
-    transactions = [*dataset.get("transactions", []), payload]
-    save_dataset(dataset_id, _rebuild_dataset(transactions, dataset.get("goals", {})))
-    return jsonify({"dataset_id": dataset_id, "transaction_count": len(transactions)})
+
+    def edit(dataset: dict) -> dict:
+        if find_transaction_positions(dataset, payload["tx_id"]):
+            raise _DuplicateTransaction(payload["tx_id"])
+        return apply_transaction_changes(dataset, appends=[payload])
+
+    try:
+        updated = _save_edit(dataset_id, edit)
+    except _DuplicateTransaction:
+        return jsonify({"error": DUPLICATE_TX_ID_ERROR}), 400
+    if updated is None:
+        return jsonify({"error": "Dataset not found."}), 404
+    return jsonify({"dataset_id": dataset_id, "transaction_count": len(updated["transactions"])})
+
+
+def _parse_date_args(names: tuple[str, ...]) -> list[str | None]:
+    """Return the named query parameters as ISO dates; raise ValueError if malformed."""
+    values = []
+    for name in names:
+        value = request.args.get(name) or None
+        if value is not None:
+            value = datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+        values.append(value)
+    return values
 
 
 @app.route("/api/datasets/<dataset_id>/transactions", methods=["GET"])
 def list_transactions(dataset_id: str):
+    if not any(name in request.args for name in PAGE_QUERY_PARAMS):
+        dataset = get_dataset(dataset_id)
+        if dataset is None:
+            return jsonify({"error": "Dataset not found."}), 404
+        return jsonify({"dataset_id": dataset_id, "transactions": dataset["transactions"].to_records()})
+
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}."}), 400
+
+    order = request.args.get("order", "asc")
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "order must be 'asc' or 'desc'."}), 400
+
+    fields = [field.strip() for field in request.args.get("fields", "").split(",") if field.strip()] or None
+    unknown = sorted(set(fields or []) - set(TRANSACTION_COLUMNS))
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}."}), 400
+
+    try:
+        start, end = _parse_date_args(("start", "end"))
+    except ValueError:
+        return jsonify({"error": "start and end must be dates in YYYY-MM-DD format."}), 400
+
+    cursor = None
+    if request.args.get("cursor"):
+        try:
+            cursor = decode_cursor(request.args["cursor"])
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+
+    categories = list(dict.fromkeys(category for category in request.args.getlist("category") if category)) or None
+
     dataset = get_dataset(dataset_id)
     if dataset is None:
         return jsonify({"error": "Dataset not found."}), 404
 
-    return jsonify({"dataset_id": dataset_id, "transactions": dataset.get("transactions", [])})
+    page = list_transactions_page(
+        dataset["transactions"],
+        limit=limit,
+        cursor=cursor,
+        descending=order == "desc",
+        start=start,
+        end=end,
+        categories=categories,
+        query=request.args.get("q") or None,
+        fields=fields,
+    )
+    return jsonify({"dataset_id": dataset_id, **page})
 
 
 @app.route("/api/datasets/<dataset_id>/transactions/<tx_id>", methods=["PUT"])
 def update_transaction(dataset_id: str, tx_id: str):
-    dataset = get_dataset(dataset_id)
-    if dataset is None:
-        return jsonify({"error": "Dataset not found."}), 404
-
     payload = request.get_json(silent=True) or {}
-    required = ["date", "description", "merchant", "amount"]
-    if any(field not in payload for field in required):
+    if any(field not in payload for field in REQUIRED_TRANSACTION_FIELDS):
         return jsonify({"error": "Body must include date, description, merchant, and amount."}), 400
 
-    updated = False
-    transactions = []
-    for transaction in dataset.get("transactions", []):
-        if transaction.get("tx_id") == tx_id:
-            updated = True
-            transactions.append(
-                {
-                    **transaction,
-                    **payload,
-                    "tx_id": tx_id,
-                }
-            )
-        else:
-            transactions.append(transaction)
+    def edit(dataset: dict) -> dict:
+        transactions = dataset["transactions"]
+        updates = {
+            position: {**transactions[position], **payload, "tx_id": tx_id}
+            for position in find_transaction_positions(dataset, tx_id)
+        }
+        if not updates:
+            raise _NotFound(tx_id)
+        return apply_transaction_changes(dataset, updates=updates)
 
-    if not updated:
+    try:
+        updated = _save_edit(dataset_id, edit)
+    except _NotFound:
         return jsonify({"error": "Transaction not found."}), 404
-
-    save_dataset(dataset_id, _rebuild_dataset(transactions, dataset.get("goals", {})))
+    if updated is None:
+        return jsonify({"error": "Dataset not found."}), 404
     return jsonify({"dataset_id": dataset_id, "tx_id": tx_id})
 
 
 @app.route("/api/datasets/<dataset_id>/transactions/<tx_id>", methods=["DELETE"])
 def delete_transaction(dataset_id: str, tx_id: str):
-    dataset = get_dataset(dataset_id)
-    if dataset is None:
-        return jsonify({"error": "Dataset not found."}), 404
+    def edit(dataset: dict) -> dict:
+        positions = find_transaction_positions(dataset, tx_id)
+        if not positions:
+            raise _NotFound(tx_id)
+        return apply_transaction_changes(dataset, deletes=positions)
 
-    previous = dataset.get("transactions", [])
-    transactions = [transaction for transaction in previous if transaction.get("tx_id") != tx_id]
-    if len(transactions) == len(previous):
+    try:
+        updated = _save_edit(dataset_id, edit)
+    except _NotFound:
         return jsonify({"error": "Transaction not found."}), 404
-
-    save_dataset(dataset_id, _rebuild_dataset(transactions, dataset.get("goals", {})))
+    if updated is None:
+        return jsonify({"error": "Dataset not found."}), 404
     return jsonify({"dataset_id": dataset_id, "tx_id": tx_id})
 
 
-@app.route("/api/datasets/<dataset_id>/goals", methods=["PUT"])
-def upsert_goals(dataset_id: str):
-    dataset = get_dataset(dataset_id)
-    if dataset is None:
+class _InvalidBatch(Exception):
+    """Raised by a batch edit when operations refer to missing or existing transactions."""
+
+    def __init__(self, errors: list[dict]):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _batch_errors(operations: list) -> list[dict]:
+    """Check what can be checked without the dataset; one entry per bad operation."""
+    errors = []
+    seen_tx_ids: set[str] = set()
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get("op") not in ("add", "update", "delete"):
+            errors.append({"index": index, "error": "op must be 'add', 'update' or 'delete'."})
+            continue
+        transaction = operation.get("transaction")
+        if operation["op"] != "delete" and not (
+            isinstance(transaction, dict) and all(field in transaction for field in REQUIRED_TRANSACTION_FIELDS)
+        ):
+            errors.append({"index": index, "error": "transaction must include date, description, merchant, and amount."})
+            continue
+        if operation["op"] == "add":
+            # Adds without a tx_id get a fresh one.
+            tx_id = transaction.get("tx_id")
+            if not tx_id:
+                continue
+            if not isinstance(tx_id, str):
+                errors.append({"index": index, "error": "tx_id must be a string."})
+                continue
+        else:
+            tx_id = operation.get("tx_id")
+        if not isinstance(tx_id, str) or not tx_id:
+            errors.append({"index": index, "error": "tx_id is required."})
+        elif tx_id in seen_tx_ids:
+            errors.append({"index": index, "error": "tx_id appears more than once in the batch."})
+        else:
+            seen_tx_ids.add(tx_id)
+    return errors
+
+
+@app.route("/api/datasets/<dataset_id>/transactions/batch", methods=["POST"])
+def apply_transaction_batch(dataset_id: str):
+    payload = request.get_json(silent=True) or {}
+    operations = payload.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "Body must include a non-empty operations array."}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({"error": f"At most {BATCH_MAX_OPERATIONS} operations per batch."}), 400
+
+    errors = _batch_errors(operations)
+    if errors:
+        return jsonify({"error": "Invalid operations; nothing was applied.", "errors": errors}), 400
+
+    appends = []
+    for operation in operations:
+        if operation["op"] == "add":
+            transaction = dict(operation["transaction"])
+            transaction["tx_id"] = transaction.get("tx_id") or str(uuid.uuid4())
+            transaction["source"] = transaction.get("source") or "manual"
+            appends.append(transaction)
+
+    # Explicit tx_ids of adds, by operation index; the rest were generated.
+    added_tx_ids = {
+        index: operation["transaction"]["tx_id"]
+        for index, operation in enumerate(operations)
+        if operation["op"] == "add" and operation["transaction"].get("tx_id")
+    }
+
+    def edit(dataset: dict) -> dict:
+        transactions = dataset["transactions"]
+        found = locate_transactions(
+            dataset,
+            [*added_tx_ids.values(), *(operation["tx_id"] for operation in operations if operation["op"] != "add")],
+        )
+        updates: dict[int, dict] = {}
+        deletes: list[int] = []
+        errors = []
+        for index, operation in enumerate(operations):
+            if operation["op"] == "add":
+                if added_tx_ids.get(index) in found:
+                    errors.append({"index": index, "error": DUPLICATE_TX_ID_ERROR})
+                continue
+            positions = found.get(operation["tx_id"])
+            if not positions:
+                errors.append({"index": index, "error": "Transaction not found."})
+            elif operation["op"] == "delete":
+                deletes.extend(positions)
+            else:
+                for position in positions:
+                    updates[position] = {**transactions[position], **operation["transaction"], "tx_id": operation["tx_id"]}
+        if errors:
+            raise _InvalidBatch(errors)
+        return apply_transaction_changes(dataset, appends=appends, updates=updates, deletes=deletes)
+
+    try:
+        updated = _save_edit(dataset_id, edit)
+    except _InvalidBatch as exc:
+        return jsonify({"error": "Invalid operations; nothing was applied.", "errors": exc.errors}), 400
+    if updated is None:
         return jsonify({"error": "Dataset not found."}), 404
 
+    counts = {op: sum(operation["op"] == op for operation in operations) for op in ("update", "delete")}
+    return jsonify(
+        {
+            "dataset_id": dataset_id,
+            "added": [transaction["tx_id"] for transaction in appends],
+            "updated": counts["update"],
+            "deleted": counts["delete"],
+            "transaction_count": len(updated["transactions"]),
+        }
+    )
+
+
+@app.route("/api/datasets/<dataset_id>/goals", methods=["PUT"])
+def upsert_goals(dataset_id: str):
     payload = request.get_json(silent=True) or {}
     monthly_budget = payload.get("monthly_budget")
     savings_goal = payload.get("savings_goal")
 
-    goals = dataset.get("goals", {}).copy()
-    if monthly_budget is not None:
-        goals["monthly_budget"] = float(monthly_budget)
-    if savings_goal is not None:
-        goals["savings_goal"] = float(savings_goal)
+    def edit(dataset: dict) -> dict:
+        goals = dataset.get("goals", {}).copy()
+        if monthly_budget is not None:
+            goals["monthly_budget"] = float(monthly_budget)
+        if savings_goal is not None:
+            goals["savings_goal"] = float(savings_goal)
+        return {**dataset, "goals": goals}
 
-    dataset["goals"] = goals
-    save_dataset(dataset_id, dataset)
-    return jsonify({"dataset_id": dataset_id, "goals": goals})
+    updated = _save_edit(dataset_id, edit)
+    if updated is None:
+        return jsonify({"error": "Dataset not found."}), 404
+    return jsonify({"dataset_id": dataset_id, "goals": updated["goals"]})
 
 
 @app.route("/api/datasets/<dataset_id>/calendar-events", methods=["GET"])
 def get_calendar_events(dataset_id: str):
-    dataset = get_dataset(dataset_id)
-    if dataset is None:
+    stored = get_dataset_with_stamp(dataset_id)
+    if stored is None:
         return jsonify({"error": "Dataset not found."}), 404
+    dataset, stamp = stored
 
-    def _next_due(last_charge: date, interval_days: int) -> date:
-        today = date.today()
-        safe_interval = max(1, interval_days)
-        due = last_charge
-        while due < today:
-            due = due + timedelta(days=safe_interval)
-        return due
-
-    events_map: dict[tuple[str, str], dict] = {}
-
-    # 1) Use detected subscriptions.
-    for subscription in dataset.get("subscriptions", []):
-        merchant = subscription.get("merchant", "Subscription")
-        due_iso = str(subscription.get("next_charge_date", ""))
-        if not due_iso:
-            continue
-        text = f"Pay {merchant} subscription"
-        details = f"Estimated monthly cost ${subscription.get('monthly_cost', 0)}"
-        dates = due_iso.replace("-", "")
-        url = (
-            "https://calendar.google.com/calendar/render?action=TEMPLATE"
-            f"&text={quote_plus(text)}"
-            f"&dates={dates}/{dates}"
-            f"&details={quote_plus(details)}"
-        )
-        key = (merchant, due_iso)
-        events_map[key] = {
-            "title": text,
-            "date": due_iso,
-            "google_calendar_url": url,
-        }
-
-    # 2) Include manual subscription entries as recurring due dates.
-    manual_transactions = [
-        tx
-        for tx in dataset.get("transactions", [])
-        if (
-            tx.get("source") == "manual_subscription"
-            or str(tx.get("category", "")).lower() == "subscription"
-        )
-        and float(tx.get("amount", 0) or 0) > 0
-        and tx.get("merchant")
-        and tx.get("date")
-    ]
-
-    latest_by_merchant: dict[str, dict] = {}
-    for tx in manual_transactions:
-        merchant = str(tx.get("merchant"))
-        current = latest_by_merchant.get(merchant)
-        if current is None or str(tx.get("date", "")) > str(current.get("date", "")):
-            latest_by_merchant[merchant] = tx
-
-    for merchant, tx in latest_by_merchant.items():
+    # Without a horizon the events keep their original shape: detected
+    # subscriptions at their stored next charge date.
+    horizon = request.args.get("horizon")
+    if horizon is not None:
         try:
-            last_charge = datetime.strptime(str(tx["date"]), "%Y-%m-%d").date()
+            horizon = int(horizon)
         except ValueError:
-            continue
-        interval_days = int(float(tx.get("interval_days", 30) or 30))
-        raw_next_charge = str(tx.get("next_charge_date", "") or "").strip()
-        if raw_next_charge:
-            try:
-                base_due = datetime.strptime(raw_next_charge, "%Y-%m-%d").date()
-            except ValueError:
-                base_due = last_charge
-        else:
-            base_due = last_charge
-
-        due_date = _next_due(base_due, interval_days)
-        due_iso = due_date.isoformat()
-        text = f"Pay {merchant} subscription"
-        details = f"Estimated monthly cost ${round(float(tx.get('amount', 0) or 0), 2)}"
-        dates = due_iso.replace("-", "")
-        url = (
-            "https://calendar.google.com/calendar/render?action=TEMPLATE"
-            f"&text={quote_plus(text)}"
-            f"&dates={dates}/{dates}"
-            f"&details={quote_plus(details)}"
-        )
-        key = (merchant, due_iso)
-        if key not in events_map:
-            events_map[key] = {
-                "title": text,
-                "date": due_iso,
-                "google_calendar_url": url,
-            }
-
-    # 3) Include one-time future payments created from the calendar UI.
-    for tx in dataset.get("transactions", []):
-        if tx.get("source") != "one_time_future_payment":
-            continue
-        tx_date = str(tx.get("date", "")).strip()
-        merchant = str(tx.get("merchant", "Planned payment")).strip() or "Planned payment"
-        description = str(tx.get("description", "")).strip()
-        if not tx_date:
-            continue
-        try:
-            parsed = datetime.strptime(tx_date, "%Y-%m-%d").date()
-        except ValueError:
-            continue
-        if parsed < date.today():
-            continue
+            horizon = 0
+        if not 1 <= horizon <= MAX_HORIZON:
+            return jsonify({"error": f"horizon must be between 1 and {MAX_HORIZON}."}), 400
 
-        title = description or f"One-time payment: {merchant}"
-        details = f"Planned amount ${round(float(tx.get('amount', 0) or 0), 2)}"
-        dates = tx_date.replace("-", "")
-        url = (
-            "https://calendar.google.com/calendar/render?action=TEMPLATE"
-            f"&text={quote_plus(title)}"
-            f"&dates={dates}/{dates}"
-            f"&details={quote_plus(details)}"
-        )
-        key = (title, tx_date)
-        events_map[key] = {
-            "title": title,
-            "date": tx_date,
-            "google_calendar_url": url,
-        }
+    events = cached_calendar_events((dataset_id, stamp), dataset_calendar(dataset), date.today(), horizon)
+    return jsonify({"dataset_id": dataset_id, "events": events})
 
-    events = sorted(events_map.values(), key=lambda item: item["date"])
 
-    return jsonify({"dataset_id": dataset_id, "events": events})
+@app.route("/api/datasets/<dataset_id>/calendar.ics", methods=["GET"])
+def get_calendar_ics(dataset_id: str):
+    stored = get_dataset_with_stamp(dataset_id)
+    if stored is None:
+        return jsonify({"error": "Dataset not found."}), 404
+    dataset, stamp = stored
+
+    written_at = datetime.fromtimestamp(stamp[1] / 1e9, tz=timezone.utc)
+    body = build_ics(dataset_calendar(dataset), dataset_id, written_at)
+    response = Response(body, mimetype="text/calendar")
+    response.set_etag(hashlib.sha1(body.encode("utf-8")).hexdigest())
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @app.route("/api/datasets/<dataset_id>/summary", methods=["GET"])
@@ -407,7 +475,19 @@ def get_summary(dataset_id: str):
     if dataset is None:
         return jsonify({"error": "Dataset not found."}), 404
 
-    return jsonify({"dataset_id": dataset_id, "goals": dataset.get("goals", {}), **dataset["summary"]})
+    try:
+        start, end = _parse_date_args(("start", "end"))
+    except ValueError:
+        return jsonify({"error": "start and end must be dates in YYYY-MM-DD format."}), 400
+    categories = list(dict.fromkeys(category for category in request.args.getlist("category") if category)) or None
+    if start and end and start > end:
+        return jsonify({"error": "start must not be after end."}), 400
+
+    if start is None and end is None and categories is None:
+        summary = dataset["summary"]
+    else:
+        summary = summarize_range(dataset, start, end, categories)
+    return jsonify({"dataset_id": dataset_id, "goals": dataset.get("goals", {}), **summary})
 
 
 @app.route("/api/datasets/<dataset_id>/subscriptions", methods=["GET"])
@@ -445,6 +525,35 @@ def coach(dataset_id: str):
     return jsonify({"dataset_id": dataset_id, **response})
 
 
+@app.route("/api/datasets/<dataset_id>/coach/stream", methods=["POST"])
+def coach_stream(dataset_id: str):
+    dataset = get_dataset(dataset_id)
+    if dataset is None:
+        return jsonify({"error": "Dataset not found."}), 404
+
+    payload = request.get_json(silent=True) or {}
+    question = payload.get("question")
+    if not isinstance(question, str) or not question.strip():
+        return jsonify({"error": "Body must include non-empty 'question'."}), 400
+
+    events = stream_coach_response(
+        question=question,
+        summary=dataset["summary"],
+        subscriptions=dataset["subscriptions"],
+    )
+
+    def render():
+        for event, data in events:
+            # "fallback" and "done" carry the same payload as /coach.
+            body = data if event == "delta" else {"dataset_id": dataset_id, **data}
+            yield f"event: {event}\ndata: {json.dumps(body)}\n\n"
+
+    response = Response(render(), mimetype="text/event-stream")
+    response.cache_control.no_cache = True
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "5001"))
     app.run(host="0.0.0.0", port=port, debug=True)
@@ -0,0 +1,100 @@
+"""Load-test the coach's bounded model pool against a local stub LLM server.
+
+The stub answers every prompt after a fixed delay and records how many calls
+it is serving at once. Each question is distinct, so the response cache never
+answers for the model. Run from ``backend/``::
+
+    python -m benchmarks.bench_coach [requests] [latency_seconds]
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services import coach_service
+from services.coach_service import build_coach_response
+
+SUMMARY = {
+    "total_spent_this_month": 1234.5,
+    "biggest_category": {"name": "Food"},
+    "subscription_monthly_total": 42.0,
+    "category_totals": [{"category": "Food", "amount": 600.0}, {"category": "Transport", "amount": 200.0}],
+}
+
+
+class StubLLM(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: StubLLM
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.calls += 1
+            self.server.peak = max(self.server.peak, self.server.in_flight)
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.in_flight -= 1
+        body = json.dumps({"text": "Stub answer."}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def main(requests: int, latency: float) -> None:
+    # Capacity and timeout warnings are expected here; keep the report readable.
+    logging.getLogger(coach_service.__name__).setLevel(logging.ERROR)
+    server = StubLLM(latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/generate"
+
+    def generate(prompt: str, api_key: str) -> str:
+        request = urllib.request.Request(url, data=prompt.encode("utf-8"), method="POST")
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())["text"]
+
+    def ask(number: int) -> tuple[float, str]:
+        start = time.perf_counter()
+        response = build_coach_response(f"How can I save money? ({number})", SUMMARY, [], "stub-key", generate)
+        return time.perf_counter() - start, response["response_source"]
+
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        results = list(pool.map(ask, range(requests)))
+    server.shutdown()
+
+    for source in ("gemini", "rules"):
+        timings = sorted(seconds for seconds, answered_by in results if answered_by == source)
+        if timings:
+            print(f"{source:>7}: {len(timings):>4} answers, median {timings[len(timings) // 2]:.3f}s, max {timings[-1]:.3f}s")
+    print(
+        f"stub calls {server.calls}, peak concurrency {server.peak} "
+        f"(limit {coach_service.COACH_MAX_CONCURRENCY}, wait {coach_service.COACH_WAIT_SECONDS}s)"
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 32, float(args[1]) if len(args) > 1 else 1.0)
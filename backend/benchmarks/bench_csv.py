@@ -0,0 +1,92 @@
+"""Benchmark the CSV fast path against the original parse.
+
+Synthetic bank exports use ``MM/DD/YYYY`` dates and carry extra columns the
+importer ignores. Run from ``backend/``::
+
+    python -m benchmarks.bench_csv [rows ...]
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from services.csv_service import (
+    AMOUNT_COLUMNS,
+    DATE_COLUMNS,
+    DESCRIPTION_COLUMNS,
+    MERCHANT_COLUMNS,
+    _find_column,
+    parse_and_normalize_csv,
+    pyarrow,
+)
+
+MERCHANTS = ["NETFLIX.COM", "UBER *TRIP", "Whole Foods Market", "City Electric", "ACME Payroll", "Corner Cafe"]
+
+
+def parse_legacy(file_bytes: bytes) -> pd.DataFrame:
+    """The original parse: full dtype inference and format-less to_datetime."""
+    df = pd.read_csv(BytesIO(file_bytes))
+    normalized_columns = [str(col).strip().lower() for col in df.columns]
+    df.columns = normalized_columns
+
+    date_col = _find_column(normalized_columns, DATE_COLUMNS)
+    merchant_col = _find_column(normalized_columns, MERCHANT_COLUMNS)
+    description_col = _find_column(normalized_columns, DESCRIPTION_COLUMNS)
+    amount_col = _find_column(normalized_columns, AMOUNT_COLUMNS)
+
+    working = pd.DataFrame()
+    working["date"] = pd.to_datetime(df[date_col], errors="coerce")
+    working["amount"] = pd.to_numeric(df[amount_col], errors="coerce")
+    working["merchant"] = df[merchant_col].astype(str).str.strip()
+    desc_series = df[description_col] if description_col else df[merchant_col]
+    working["description"] = desc_series.astype(str).str.strip()
+    working = working.dropna(subset=["date", "amount"])
+    working = working[working["merchant"] != ""]
+    working["date"] = working["date"].dt.strftime("%Y-%m-%d")
+    working["amount"] = working["amount"].astype(float).round(2)
+    return working[["date", "merchant", "amount", "description"]]
+
+
+def make_export(rows: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2000, rows), unit="D")
+    merchants = rng.choice(MERCHANTS, rows)
+    frame = pd.DataFrame(
+        {
+            "Transaction Date": dates.strftime("%m/%d/%Y"),
+            "Description": merchants,
+            "Memo": np.char.add("REF ", rng.integers(0, 10**8, rows).astype(str)),
+            "Type": rng.choice(["DEBIT", "CREDIT", "CHECK"], rows),
+            "Amount": rng.normal(30, 80, rows).round(2),
+            "Balance": rng.normal(5000, 1000, rows).round(2),
+            "Account": "CHK-0001",
+        }
+    )
+    return frame.to_csv(index=False).encode("utf-8")
+
+
+def _time(func, data: bytes) -> tuple[float, pd.DataFrame]:
+    start = time.perf_counter()
+    result = func(data)
+    return time.perf_counter() - start, result
+
+
+def main(sizes: list[int]) -> None:
+    print(f"pyarrow engine: {'available' if pyarrow is not None else 'not installed'}")
+    print(f"{'rows':>10} {'legacy (s)':>12} {'fast path (s)':>15} {'speedup':>9}")
+    for rows in sizes:
+        data = make_export(rows)
+        legacy_seconds, expected = _time(parse_legacy, data)
+        fast_seconds, actual = _time(parse_and_normalize_csv, data)
+        if not expected.reset_index(drop=True).equals(actual.reset_index(drop=True)):
+            raise SystemExit(f"Parse mismatch at {rows} rows")
+        print(f"{rows:>10} {legacy_seconds:>12.3f} {fast_seconds:>15.3f} {legacy_seconds / fast_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
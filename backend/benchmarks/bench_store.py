@@ -0,0 +1,104 @@
+"""Benchmark cold dataset reads: memory-mapped columns against a full load.
+
+Each size is saved once to a temporary store; every timing then starts from
+an empty dataset cache, as a freshly started worker would.
+
+The ``+log`` rows repeat the reads with edits pending in the dataset's log.
+``full+log`` holds compaction off, so every read replays the log, as every
+cold read did before reads folded it. For ``mapped+log`` the first cold
+read (timed on its own as ``first read``) replays the log and folds it into
+the snapshot in the background; the reads after it map the folded file.
+Run from ``backend/``::
+
+    python -m benchmarks.bench_store [rows ...]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("DATASTORE_PATH", os.path.join(tempfile.mkdtemp(prefix="bench_store_"), "datasets.json"))
+
+import store  # noqa: E402
+from services.dataset_service import apply_transaction_changes, rebuild_dataset, summarize_range  # noqa: E402
+from services.pagination_service import list_transactions_page  # noqa: E402
+
+MERCHANTS = ["NETFLIX.COM", "UBER *TRIP", "Whole Foods Market", "City Electric", "ACME Payroll", "Corner Cafe"]
+LOG_EDITS = 8
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 2000, rows), unit="D")
+    merchants = rng.choice(MERCHANTS, rows)
+    return pd.DataFrame(
+        {
+            "date": dates.strftime("%Y-%m-%d"),
+            "merchant": merchants,
+            "description": np.char.add(merchants.astype(str), rng.integers(0, 10**6, rows).astype(str)),
+            "amount": rng.normal(30, 80, rows).round(2),
+            "source": "csv",
+        }
+    )
+
+
+def _cold(dataset_id: str, action) -> float:
+    store._CACHE.clear()
+    start = time.perf_counter()
+    action(store.get_dataset(dataset_id))
+    return time.perf_counter() - start
+
+
+def _measure(dataset_id: str) -> list[float]:
+    return [
+        _cold(dataset_id, lambda dataset: dataset["summary"]),
+        _cold(dataset_id, lambda dataset: list_transactions_page(dataset["transactions"], limit=50)),
+        _cold(dataset_id, lambda dataset: summarize_range(dataset, "2021-03-01", "2021-03-31", ["Transport"])),
+    ]
+
+
+def _append_edits(dataset_id: str, count: int) -> None:
+    for number in range(count):
+        edit = {"date": f"2021-03-{number + 1:02d}", "merchant": MERCHANTS[number % len(MERCHANTS)], "description": "edit", "amount": 12.5}
+        store.save_dataset(dataset_id, apply_transaction_changes(store.get_dataset(dataset_id), appends=[edit]))
+
+
+def _measure_full(dataset_id: str) -> list[float]:
+    map_arrays = store._map_arrays
+    store._map_arrays = lambda handle: None
+    try:
+        return _measure(dataset_id)
+    finally:
+        store._map_arrays = map_arrays
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'rows':>10} {'read':>10} {'summary (s)':>12} {'first page (s)':>15} {'range (s)':>10}")
+    schedule_compaction = store._schedule_compaction
+    for rows in sizes:
+        dataset_id = f"bench-{rows}"
+        store.save_dataset(dataset_id, rebuild_dataset(make_frame(rows)))
+        results = {"full": _measure_full(dataset_id), "mapped": _measure(dataset_id)}
+        _append_edits(dataset_id, LOG_EDITS)
+        store._schedule_compaction = lambda dataset_id: None
+        try:
+            results["full+log"] = _measure_full(dataset_id)
+        finally:
+            store._schedule_compaction = schedule_compaction
+        first_read = _cold(dataset_id, lambda dataset: dataset["summary"])
+        store._compactor.submit(lambda: None).result()
+        results["mapped+log"] = _measure(dataset_id)
+
+        for label, timings in results.items():
+            print(f"{rows:>10} {label:>10} {timings[0]:>12.4f} {timings[1]:>15.4f} {timings[2]:>10.4f}")
+        print(f"{rows:>10} {'first read':>10} {first_read:>12.4f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000])
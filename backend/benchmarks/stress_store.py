@@ -0,0 +1,93 @@
+"""Hammer one dataset from several processes and check that no edit is lost.
+
+Every process adds transactions and bumps the monthly budget through the
+API, each against the same store directory, as separate gunicorn workers
+would. Afterwards every acknowledged transaction must be in the dataset and
+the revision must account for every acknowledged edit. Run from
+``backend/``::
+
+    python -m benchmarks.stress_store [processes] [edits_per_process]
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+
+def _worker(worker: int, dataset_id: str, edits: int, start: multiprocessing.Barrier, results) -> None:
+    import app as app_module
+
+    client = app_module.app.test_client()
+    added, budgets, failed = [], 0, 0
+    start.wait()
+    for edit in range(edits):
+        if edit % 4 == 3:
+            response = client.put(f"/api/datasets/{dataset_id}/goals", json={"monthly_budget": worker * 1000 + edit})
+            budgets += response.status_code == 200
+        else:
+            tx_id = f"w{worker}-{edit}"
+            response = client.post(
+                f"/api/datasets/{dataset_id}/transactions",
+                json={"tx_id": tx_id, "date": "2024-05-01", "description": "stress", "merchant": f"M{edit % 7}", "amount": 1},
+            )
+            if response.status_code == 200:
+                added.append(tx_id)
+        failed += response.status_code != 200
+    results.put((added, budgets, failed))
+
+
+def run(dataset_id: str, processes: int, edits: int) -> dict:
+    """Run the workers against a fresh ``dataset_id`` and report what was stored."""
+    import store
+    from services.dataset_service import rebuild_dataset
+
+    store.save_dataset(dataset_id, rebuild_dataset([]))
+
+    context = multiprocessing.get_context("spawn")
+    start, results = context.Barrier(processes + 1), context.Queue()
+    workers = [context.Process(target=_worker, args=(worker, dataset_id, edits, start, results)) for worker in range(processes)]
+    for process in workers:
+        process.start()
+    start.wait()  # every worker has imported the app
+    began = time.perf_counter()
+    outcomes = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - began
+    for process in workers:
+        process.join()
+
+    added = [tx_id for worker_added, _, _ in outcomes for tx_id in worker_added]
+    store._CACHE.clear()
+    dataset, revision = store.get_dataset_with_revision(dataset_id)
+    stored_ids = dataset["transactions"].column("tx_id").tolist()
+    return {
+        "elapsed": elapsed,
+        "added": added,
+        "edits_done": len(added) + sum(budgets for _, budgets, _ in outcomes),
+        "failed": sum(failed for _, _, failed in outcomes),
+        "revision": revision,
+        "stored_ids": stored_ids,
+        "lost": [tx_id for tx_id in added if tx_id not in set(stored_ids)],
+    }
+
+
+def main(processes: int, edits: int) -> None:
+    os.environ.setdefault("DATASTORE_PATH", os.path.join(tempfile.mkdtemp(prefix="stress_store_"), "datasets.json"))
+    # Compact often so log rewrites race with appends too.
+    os.environ.setdefault("DATASTORE_LOG_MAX_RECORDS", "16")
+
+    outcome = run("stress", processes, edits)
+    edits_done, elapsed = outcome["edits_done"], outcome["elapsed"]
+    print(f"{processes} processes x {edits} edits in {elapsed:.2f}s ({edits_done / elapsed:.0f} edits/s)")
+    print(f"acknowledged {edits_done}, failed {outcome['failed']}, stored transactions {len(outcome['stored_ids'])}")
+    print(f"revision {outcome['revision']} (expected {1 + edits_done}), lost transactions {len(outcome['lost'])}")
+    if outcome["lost"] or outcome["revision"] != 1 + edits_done or len(outcome["stored_ids"]) != len(outcome["added"]):
+        raise SystemExit("Lost updates detected")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 4, int(args[1]) if len(args) > 1 else 50)
@@ -0,0 +1,314 @@
+"""Upcoming-payment calendar events."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from threading import Lock
+from typing import Hashable, Iterable
+from urllib.parse import quote_plus
+
+# Events computed for (dataset version, day, horizon), shared per process.
+EVENTS_CACHE_MAX_ENTRIES = int(os.getenv("CALENDAR_CACHE_SIZE", "256"))
+MAX_HORIZON = 52
+
+
+def next_due(base: date, interval_days: int, today: date) -> date:
+    """First date on or after ``today`` in the series ``base + k * interval_days``."""
+    if base >= today:
+        return base
+    interval = max(1, interval_days)
+    periods = -(-(today - base).days // interval)
+    return base + timedelta(days=periods * interval)
+
+
+def _parse_date(value: object) -> date | None:
+    try:
+        return datetime.strptime(str(value), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _is_manual_subscription(tx: dict) -> bool:
+    return (
+        (tx.get("source") == "manual_subscription" or str(tx.get("category", "")).lower() == "subscription")
+        and float(tx.get("amount", 0) or 0) > 0
+        and bool(tx.get("merchant"))
+        and bool(tx.get("date"))
+    )
+
+
+def _is_one_time_payment(tx: dict) -> bool:
+    return tx.get("source") == "one_time_future_payment"
+
+
+def is_calendar_row(tx: dict) -> bool:
+    """Whether a transaction feeds the calendar beyond the subscription list."""
+    return _is_one_time_payment(tx) or _is_manual_subscription(tx)
+
+
+def build_calendar_plan(subscriptions: list[dict], transactions: Iterable[dict]) -> dict:
+    """Collect what the calendar needs from a dataset, independent of today's date.
+
+    ``fixed`` holds every subscription's stored next charge date,
+    ``recurring`` the latest charge of each manual subscription merchant
+    (rolled forward to today when events are generated) and ``one_time``
+    the planned one-off payments. Only transactions passing
+    :func:`is_calendar_row` matter, so callers that track those rows can pass
+    just them. Stored with the dataset on every write so generating events
+    never scans transactions.
+    """
+    transactions = list(transactions)
+    fixed = []
+    for subscription in subscriptions:
+        due_iso = str(subscription.get("next_charge_date", ""))
+        if not due_iso:
+            continue
+        fixed.append(
+            {
+                "merchant": subscription.get("merchant", "Subscription"),
+                "date": due_iso,
+                "interval_days": int(subscription.get("interval_days") or 0),
+                "details": f"Estimated monthly cost ${subscription.get('monthly_cost', 0)}",
+            }
+        )
+
+    latest_by_merchant: dict[str, dict] = {}
+    for tx in filter(_is_manual_subscription, transactions):
+        merchant = str(tx.get("merchant"))
+        current = latest_by_merchant.get(merchant)
+        if current is None or str(tx.get("date", "")) > str(current.get("date", "")):
+            latest_by_merchant[merchant] = tx
+
+    recurring = []
+    for merchant, tx in latest_by_merchant.items():
+        last_charge = _parse_date(tx["date"])
+        if last_charge is None:
+            continue
+        raw_next_charge = str(tx.get("next_charge_date", "") or "").strip()
+        base_due = (_parse_date(raw_next_charge) if raw_next_charge else None) or last_charge
+        recurring.append(
+            {
+                "merchant": merchant,
+                "base_due": base_due.isoformat(),
+                "interval_days": int(float(tx.get("interval_days", 30) or 30)),
+                "details": f"Estimated monthly cost ${round(float(tx.get('amount', 0) or 0), 2)}",
+            }
+        )
+
+    one_time = []
+    for tx in filter(_is_one_time_payment, transactions):
+        tx_date = str(tx.get("date", "")).strip()
+        parsed = _parse_date(tx_date)
+        if parsed is None:
+            continue
+        merchant = str(tx.get("merchant", "Planned payment")).strip() or "Planned payment"
+        description = str(tx.get("description", "")).strip()
+        one_time.append(
+            {
+                "title": description or f"One-time payment: {merchant}",
+                "date": tx_date,
+                "day": parsed.isoformat(),
+                "details": f"Planned amount ${round(float(tx.get('amount', 0) or 0), 2)}",
+            }
+        )
+
+    return {"fixed": fixed, "recurring": recurring, "one_time": one_time}
+
+
+def _event(title: str, due_iso: str, details: str) -> dict:
+    dates = due_iso.replace("-", "")
+    url = (
+        "https://calendar.google.com/calendar/render?action=TEMPLATE"
+        f"&text={quote_plus(title)}"
+        f"&dates={dates}/{dates}"
+        f"&details={quote_plus(details)}"
+    )
+    return {"title": title, "date": due_iso, "google_calendar_url": url}
+
+
+def _occurrences(first: date, interval_days: int, horizon: int) -> list[str]:
+    step = timedelta(days=max(1, interval_days))
+    return [(first + step * k).isoformat() for k in range(horizon)]
+
+
+def calendar_events(plan: dict, today: date, horizon: int | None = None) -> list[dict]:
+    """Return upcoming payment events, sorted by date.
+
+    With ``horizon`` each subscription contributes its next ``horizon``
+    occurrences on or after today, so the first event of every series is
+    the same whatever the horizon; a subscription without an interval
+    appears once, at its stored date unless that has passed. Without it
+    detected subscriptions keep their stored next charge date, as they
+    always have. One-time payments appear once, and only while they are not
+    in the past.
+    """
+    events_map: dict[tuple[str, str], dict] = {}
+
+    # 1) Detected and manual subscriptions at their stored next charge date,
+    # or, with a horizon, rolled forward from it. Manual subscriptions are
+    # then left to step 2, which rolls them from their latest charge.
+    manual_merchants = {item["merchant"] for item in plan["recurring"]}
+    today_iso = today.isoformat()
+    for item in plan["fixed"]:
+        if horizon is None:
+            due_dates = [item["date"]]
+        elif item["merchant"] in manual_merchants:
+            continue
+        else:
+            first = _parse_date(item["date"])
+            interval_days = item.get("interval_days") or 0
+            if first is None or interval_days <= 0:
+                due_dates = [item["date"]] if item["date"] >= today_iso else []
+            else:
+                due_dates = _occurrences(next_due(first, interval_days, today), interval_days, horizon)
+        for due_iso in due_dates:
+            events_map[(item["merchant"], due_iso)] = _event(f"Pay {item['merchant']} subscription", due_iso, item["details"])
+
+    # 2) Manual subscriptions rolled forward from their latest charge.
+    for item in plan["recurring"]:
+        first = next_due(date.fromisoformat(item["base_due"]), item["interval_days"], today)
+        for due_iso in _occurrences(first, item["interval_days"], horizon or 1):
+            key = (item["merchant"], due_iso)
+            if key not in events_map:
+                events_map[key] = _event(f"Pay {item['merchant']} subscription", due_iso, item["details"])
+
+    # 3) One-time future payments created from the calendar UI.
+    for item in plan["one_time"]:
+        if item["day"] < today_iso:
+            continue
+        events_map[(item["title"], item["date"])] = _event(item["title"], item["date"], item["details"])
+
+    return sorted(events_map.values(), key=lambda item: item["date"])
+
+
+class EventsCache:
+    """Bounded LRU of generated event lists keyed by dataset version and day."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, list[dict]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> list[dict] | None:
+        with self._lock:
+            events = self._entries.get(key)
+            if events is not None:
+                self._entries.move_to_end(key)
+            return events
+
+    def put(self, key: Hashable, events: list[dict]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = events
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_EVENTS_CACHE = EventsCache(EVENTS_CACHE_MAX_ENTRIES)
+
+
+def cached_calendar_events(version: Hashable, plan: dict, today: date, horizon: int | None = None) -> list[dict]:
+    """:func:`calendar_events`, memoized on ``(version, today, horizon)``.
+
+    ``version`` must change whenever the dataset behind ``plan`` does.
+    """
+    key = (version, today.isoformat(), horizon)
+    events = _EVENTS_CACHE.get(key)
+    if events is None:
+        events = calendar_events(plan, today, horizon)
+        _EVENTS_CACHE.put(key, events)
+    return events
+
+
+def _ics_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _ics_fold(line: str) -> str:
+    # Content lines are limited to 75 octets; longer ones continue on lines
+    # starting with a space. Never split a multi-byte character.
+    folded: list[str] = []
+    current = ""
+    size = 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > 75:
+            folded.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    folded.append(current)
+    return "\r\n".join(folded)
+
+
+def _rrule(interval_days: int) -> str:
+    if interval_days % 7 == 0:
+        return f"FREQ=WEEKLY;INTERVAL={interval_days // 7}"
+    return f"FREQ=DAILY;INTERVAL={interval_days}"
+
+
+def build_ics(plan: dict, calendar_id: str, written_at: datetime) -> str:
+    """Render ``plan`` as an iCalendar document.
+
+    Every subscription becomes one all-day VEVENT with an RRULE at its
+    interval, and every planned one-time payment a single VEVENT. The
+    document doesn't depend on today's date, so it only changes when the
+    dataset does; calendar clients expand the recurrences themselves.
+    ``written_at`` (UTC) is used as every event's DTSTAMP.
+    """
+    dtstamp = written_at.strftime("%Y%m%dT%H%M%SZ")
+    events: list[tuple[str, str, str, str, int]] = []
+
+    # Manual subscriptions recur from their latest charge; detected ones
+    # from their next charge date.
+    manual_merchants = {item["merchant"] for item in plan["recurring"]}
+    for item in plan["fixed"]:
+        if item["merchant"] in manual_merchants or _parse_date(item["date"]) is None:
+            continue
+        events.append(
+            (f"sub-{item['merchant']}", f"Pay {item['merchant']} subscription", item["date"], item["details"], item["interval_days"])
+        )
+    for item in plan["recurring"]:
+        events.append(
+            (
+                f"manual-{item['merchant']}",
+                f"Pay {item['merchant']} subscription",
+                item["base_due"],
+                item["details"],
+                max(1, item["interval_days"]),
+            )
+        )
+    for item in plan["one_time"]:
+        events.append((f"once-{item['title']}-{item['day']}", item["title"], item["day"], item["details"], 0))
+
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//MoneyMagic//Subscriptions//EN",
+        "CALSCALE:GREGORIAN",
+        "X-WR-CALNAME:MoneyMagic payments",
+    ]
+    for key, summary, start, details, interval_days in events:
+        uid = hashlib.sha1(f"{calendar_id}:{key}".encode("utf-8")).hexdigest()
+        lines.extend(
+            [
+                "BEGIN:VEVENT",
+                f"UID:{uid}@moneymagic",
+                f"DTSTAMP:{dtstamp}",
+                f"DTSTART;VALUE=DATE:{_parse_date(start).strftime('%Y%m%d')}",
+                f"SUMMARY:{_ics_text(summary)}",
+                f"DESCRIPTION:{_ics_text(details)}",
+            ]
+        )
+        if interval_days > 0:
+            lines.append(f"RRULE:{_rrule(interval_days)}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "".join(f"{_ics_fold(line)}\r\n" for line in lines)
@@ -2,6 +2,15 @@
 
 from __future__ import annotations
 
+import hashlib
+import os
+import re
+from collections import OrderedDict, deque
+from functools import lru_cache
+from threading import Lock
+from typing import Mapping, Sequence
+
+import numpy as np
 import pandas as pd
 
 CATEGORY_RULES = {
@@ -13,21 +22,211 @@ CATEGORY_RULES = {
     "Entertainment": ["netflix", "spotify", "hulu", "disney"],
     "Shopping": ["amazon", "target"],
 }
+DEFAULT_CATEGORY = "Other"
 
+# Rule sets larger than this are matched with the Aho-Corasick automaton;
+# smaller ones are faster as one regex pass per category.
+REGEX_MAX_KEYWORDS = 200
 
-def categorize_transactions(df: pd.DataFrame) -> pd.DataFrame:
-    categorized = df.copy()
+# Process-wide memo of haystack -> category, shared by every dataset.
+MEMO_MAX_ENTRIES = int(os.getenv("CATEGORY_MEMO_SIZE", "100000"))
+
+FrozenRules = tuple[tuple[str, tuple[str, ...]], ...]
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over every keyword of a rule set.
+
+    ``match`` scans text once, in time linear in its length regardless of the
+    number of keywords, and returns the first category (in rule order) that
+    has a keyword occurring anywhere in the text.
+    """
+
+    def __init__(self, rules: Mapping[str, Sequence[str]]):
+        self.categories = list(rules)
+        no_match = len(self.categories)
+        goto: list[dict[str, int]] = [{}]
+        best = [no_match]
+
+        for rank, keywords in enumerate(rules.values()):
+            for keyword in keywords:
+                state = 0
+                for char in keyword.lower():
+                    next_state = goto[state].get(char)
+                    if next_state is None:
+                        next_state = len(goto)
+                        goto[state][char] = next_state
+                        goto.append({})
+                        best.append(no_match)
+                    state = next_state
+                best[state] = min(best[state], rank)
+
+        # Breadth-first fail links; each state also inherits the best rule of
+        # its fail state, i.e. of the longest suffix that is a keyword prefix.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        for state in queue:
+            best[state] = min(best[state], best[0])
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                best[next_state] = min(best[next_state], best[fail[next_state]])
+                queue.append(next_state)
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+        self._no_match = no_match
+
+    def match(self, text: str) -> str | None:
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found = best[0]
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] < found:
+                found = best[state]
+                if found == 0:
+                    break
+        return self.categories[found] if found < self._no_match else None
+
+
+class CompiledRules:
+    """Matchers for one rule set, built once and shared via :func:`compile_rules`."""
+
+    def __init__(self, rules: FrozenRules):
+        self.categories = [category for category, _ in rules]
+        self.version = hashlib.sha1(repr(rules).encode("utf-8")).hexdigest()[:16]
+        self.keyword_count = sum(len(keywords) for _, keywords in rules)
+        self.patterns = [
+            re.compile("|".join(re.escape(keyword.lower()) for keyword in keywords) or "(?!)")
+            for _, keywords in rules
+        ]
+        self._rules = rules
+        self._matcher: KeywordMatcher | None = None
+
+    @property
+    def matcher(self) -> KeywordMatcher:
+        if self._matcher is None:
+            self._matcher = KeywordMatcher(dict(self._rules))
+        return self._matcher
+
+    def categorize(self, haystack: pd.Series) -> np.ndarray:
+        """Return the category for each lowercased haystack string."""
+        if self.keyword_count > REGEX_MAX_KEYWORDS:
+            matcher = self.matcher
+            return np.array([matcher.match(text) or DEFAULT_CATEGORY for text in haystack], dtype=object)
+
+        conditions = [haystack.str.contains(pattern).to_numpy(dtype=bool) for pattern in self.patterns]
+        return np.select(conditions, self.categories, default=DEFAULT_CATEGORY)
+
+
+def freeze_rules(rules: Mapping[str, Sequence[str]]) -> FrozenRules:
+    return tuple((str(category), tuple(str(keyword) for keyword in keywords)) for category, keywords in rules.items())
 
-    def categorize_row(row: pd.Series) -> str:
-        existing_category = str(row.get("category", "")).strip()
-        if existing_category and existing_category.lower() != "nan":
-            return existing_category
 
-        haystack = f"{row['merchant']} {row['description']}".lower()
-        for category, keywords in CATEGORY_RULES.items():
-            if any(keyword in haystack for keyword in keywords):
-                return category
-        return "Other"
+@lru_cache(maxsize=16)
+def compile_rules(rules: FrozenRules) -> CompiledRules:
+    """Compile a frozen rule set; cached by the rule set's hash."""
+    return CompiledRules(rules)
+
+
+class CategoryMemo:
+    """Bounded LRU of ``(rule set version, haystack) -> category``."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, version: str, haystacks: Sequence[str]) -> list[str | None]:
+        found: list[str | None] = []
+        with self._lock:
+            for text in haystacks:
+                category = self._entries.get((version, text))
+                if category is not None:
+                    self._entries.move_to_end((version, text))
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                found.append(category)
+        return found
+
+    def store(self, version: str, haystacks: Sequence[str], categories: Sequence[str]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            for text, category in zip(haystacks, categories):
+                self._entries[(version, text)] = category
+                self._entries.move_to_end((version, text))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+_MEMO = CategoryMemo(MEMO_MAX_ENTRIES)
+
+
+def memo_stats() -> dict:
+    """Return hit/miss counters for the merchant -> category memo."""
+    return _MEMO.stats()
+
+
+def _resolve(compiled: CompiledRules, haystack: pd.Series) -> np.ndarray:
+    # Match each distinct haystack once; the memo skips matching entirely for
+    # merchant strings already seen with this rule set.
+    codes, uniques = pd.factorize(haystack)
+    uniques = [str(text) for text in uniques]
+    resolved = _MEMO.lookup(compiled.version, uniques)
+    missing = [position for position, category in enumerate(resolved) if category is None]
+    if missing:
+        texts = [uniques[position] for position in missing]
+        matched = compiled.categorize(pd.Series(texts, dtype=object))
+        for position, category in zip(missing, matched):
+            resolved[position] = str(category)
+        _MEMO.store(compiled.version, texts, [resolved[position] for position in missing])
+    return np.array(resolved, dtype=object)[codes]
+
+
+def categorize_transactions(df: pd.DataFrame, rules: Mapping[str, Sequence[str]] | None = None) -> pd.DataFrame:
+    """Fill in ``category`` from keyword rules, keeping any existing category.
+
+    ``rules`` defaults to ``CATEGORY_RULES``; pass a user's own mapping to
+    override it. The first category, in rule order, with a keyword found in
+    the lowercased "merchant description" text wins.
+    """
+    compiled = compile_rules(freeze_rules(CATEGORY_RULES if rules is None else rules))
+
+    categorized = df.copy()
+    if "category" in categorized.columns:
+        existing = categorized["category"].astype(str).str.strip()
+    else:
+        existing = pd.Series("", index=categorized.index, dtype=object)
+    pending = (existing == "") | (existing.str.lower() == "nan")
+
+    categories = existing.to_numpy(dtype=object, copy=True)
+    if pending.any():
+        rows = categorized.loc[pending]
+        haystack = (rows["merchant"].astype(str) + " " + rows["description"].astype(str)).str.lower()
+        categories[pending.to_numpy()] = _resolve(compiled, haystack)
 
-    categorized["category"] = categorized.apply(categorize_row, axis=1)
+    categorized["category"] = categories
     return categorized
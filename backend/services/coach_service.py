@@ -3,13 +3,23 @@
 This module loads a Gemini API key (from env or a local .venv file) and will
 attempt to call the Gemini model to produce a short summary when available.
 If the key or API call is unavailable, it falls back to the internal summary.
+Generated answers are cached by prompt, so repeat questions about an
+unchanged dataset skip the model call.
 """
 
 from __future__ import annotations
+import hashlib
+import json
 import logging
 import os
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from threading import BoundedSemaphore, Lock
+from queue import Empty, Queue
+from typing import Any, Callable, Iterable, Iterator, Optional
 
 try:
     from google import genai
@@ -18,6 +28,33 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+GEMINI_MODEL = "gemini-3-flash-preview"
+# Send model requests somewhere other than Google's endpoint, e.g. a proxy
+# or a local stub server.
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "").strip() or None
+
+# Generated answers, keyed by a hash of the model and prompt. The disk tier is
+# off unless COACH_CACHE_DIR is set; point it at a shared directory to let
+# every worker reuse an answer.
+COACH_CACHE_MAX_ENTRIES = int(os.getenv("COACH_CACHE_SIZE", "256"))
+COACH_CACHE_TTL_SECONDS = float(os.getenv("COACH_CACHE_TTL_SECONDS", "3600"))
+COACH_CACHE_DIR = os.getenv("COACH_CACHE_DIR", "").strip() or None
+
+# Model calls run on a small per-process pool, so a slow model holds at most
+# COACH_MAX_CONCURRENCY threads. A /coach request waits for the model at most
+# COACH_WAIT_SECONDS, far below a worker timeout, before answering from the
+# rules; the call keeps running on the pool and its answer is cached for the
+# next time the question is asked. A stream that produces nothing for
+# COACH_TIMEOUT_SECONDS is abandoned the same way.
+COACH_MAX_CONCURRENCY = int(os.getenv("COACH_MAX_CONCURRENCY", "4"))
+COACH_WAIT_SECONDS = float(os.getenv("COACH_WAIT_SECONDS", "2"))
+COACH_TIMEOUT_SECONDS = float(os.getenv("COACH_TIMEOUT_SECONDS", "15"))
+
+# (prompt, api_key) -> generated text, or None when generation failed.
+Generate = Callable[[str, str], Optional[str]]
+# (prompt, api_key) -> chunks of generated text as they are produced.
+StreamGenerate = Callable[[str, str], Iterable[str]]
+
 
 def load_gemini_key() -> Optional[str]:
     # 1) prefer environment variable (safe for production/CI)
@@ -44,6 +81,8 @@ def get_gemini_runtime_status() -> dict:
 def _make_genai_client(api_key: str):
     if genai is None:
         raise RuntimeError("genai SDK not available")
+    if GEMINI_BASE_URL:
+        return genai.Client(api_key=api_key, http_options={"base_url": GEMINI_BASE_URL})
     # try both common constructor forms
     try:
         return genai.Client(api_key=api_key)
@@ -51,12 +90,28 @@ def _make_genai_client(api_key: str):
         return genai.Client(api_key)
 
 
+_client_lock = Lock()
+_client: tuple[str, Any] | None = None
+
+
+def _shared_client(api_key: str):
+    """Return the process-wide client, created on first use.
+
+    Reusing one client keeps its HTTP connections alive between questions.
+    """
+    global _client
+    with _client_lock:
+        if _client is None or _client[0] != api_key:
+            _client = (api_key, _make_genai_client(api_key))
+        return _client[1]
+
+
 def _call_gemini(question: str, api_key: str) -> Optional[str]:
     if not api_key or genai is None:
         return None
     try:
-        client = _make_genai_client(api_key)
-        resp = client.models.generate_content(model="gemini-3-flash-preview", contents=question)
+        client = _shared_client(api_key)
+        resp = client.models.generate_content(model=GEMINI_MODEL, contents=question)
 
         # extract text in a few possible shapes
         if hasattr(resp, "text") and resp.text:
@@ -76,6 +131,205 @@ def _call_gemini(question: str, api_key: str) -> Optional[str]:
         return None
 
 
+def _stream_gemini(question: str, api_key: str) -> Iterator[str]:
+    if not api_key or genai is None:
+        return
+    client = _shared_client(api_key)
+    for chunk in client.models.generate_content_stream(model=GEMINI_MODEL, contents=question):
+        text = getattr(chunk, "text", None)
+        if text:
+            yield text
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    return hashlib.sha256(f"{GEMINI_MODEL}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class CoachResponseCache:
+    """LRU of generated answers with a TTL, optionally backed by a directory.
+
+    Only successful generations are stored, so a failed model call is retried
+    on the next request instead of pinning the rules fallback. ``clock``
+    returns the current time in seconds; expiry times on disk use it too.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        directory: str | Path | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.directory = Path(directory) if directory else None
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> str | None:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry[1]
+
+    def put(self, key: str, text: str) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        entry = (self._clock() + self.ttl_seconds, text)
+        with self._lock:
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk": self.directory is not None,
+            }
+
+    def _remember(self, key: str, entry: tuple[float, str]) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str, now: float) -> tuple[float, str] | None:
+        if self.directory is None:
+            return None
+        path = self.directory / f"{key}.json"
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            entry = (float(data["expires_at"]), str(data["text"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if entry[0] <= now:
+            path.unlink(missing_ok=True)
+            return None
+        return entry
+
+    def _write_disk(self, key: str, entry: tuple[float, str]) -> None:
+        if self.directory is None:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self.directory, prefix=f".{key}.", suffix=".tmp", delete=False
+            ) as handle:
+                json.dump({"expires_at": entry[0], "text": entry[1]}, handle)
+            os.replace(handle.name, self.directory / f"{key}.json")
+        except OSError:
+            logger.warning("Could not write coach cache entry to %s", self.directory, exc_info=True)
+
+
+_RESPONSE_CACHE = CoachResponseCache(COACH_CACHE_MAX_ENTRIES, COACH_CACHE_TTL_SECONDS, COACH_CACHE_DIR)
+
+
+def coach_cache_stats() -> dict:
+    """Return hit/miss counters for the coach response cache."""
+    return _RESPONSE_CACHE.stats()
+
+
+_executor_lock = Lock()
+_executor: ThreadPoolExecutor | None = None
+_call_slots = BoundedSemaphore(max(1, COACH_MAX_CONCURRENCY))
+
+
+def _coach_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, COACH_MAX_CONCURRENCY), thread_name_prefix="coach")
+        return _executor
+
+
+def _submit_generate(prompt: str, api_key: str, generate: Generate) -> Future | None:
+    """Start a model call on the coach pool; None when every slot is busy.
+
+    A slot is held until the call itself returns, even if the request stopped
+    waiting, so stuck calls never pile up threads. The answer is cached when it
+    arrives, so a repeat of a timed-out question can still be served from it.
+    """
+    if not _call_slots.acquire(blocking=False):
+        logger.warning("Coach model calls at capacity (%s); answering from rules", COACH_MAX_CONCURRENCY)
+        return None
+    key = prompt_fingerprint(prompt)
+
+    def finished(future: Future) -> None:
+        _call_slots.release()
+        if not future.cancelled() and future.exception() is None and future.result():
+            _RESPONSE_CACHE.put(key, future.result())
+
+    future = _coach_executor().submit(generate, prompt, api_key)
+    future.add_done_callback(finished)
+    return future
+
+
+_STREAM_END = object()
+
+
+def _forward_chunks(stream: StreamGenerate, chunks: Queue) -> Generate:
+    """Adapt ``stream`` to a :data:`Generate` that also feeds ``chunks``.
+
+    Runs on the coach pool: every chunk is put on the queue as it arrives,
+    followed by ``_STREAM_END``, and the joined text is returned so the
+    complete answer is cached like any other.
+    """
+
+    def generate(prompt: str, api_key: str) -> Optional[str]:
+        parts: list[str] = []
+        try:
+            for chunk in stream(prompt, api_key):
+                if chunk:
+                    parts.append(chunk)
+                    chunks.put(chunk)
+        finally:
+            chunks.put(_STREAM_END)
+        return "".join(parts) or None
+
+    return generate
+
+
+def _cached_generate(prompt: str, api_key: str, generate: Generate) -> Optional[str]:
+    text = _RESPONSE_CACHE.get(prompt_fingerprint(prompt))
+    if text is not None:
+        return text
+    future = _submit_generate(prompt, api_key, generate)
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=COACH_WAIT_SECONDS)
+    except TimeoutError:
+        logger.info("Coach model still running after %ss; answering from rules and caching its answer", COACH_WAIT_SECONDS)
+    except Exception:
+        logger.warning("Coach model call failed; answering from rules", exc_info=True)
+    return None
+
+
 def _build_gemini_prompt(question: str, summary: dict, subscriptions: list[dict]) -> str:
     """Build a grounded prompt so answers stay within MoneyMagic data/topics."""
     category_totals = summary.get("category_totals", [])[:5]
@@ -115,27 +369,10 @@ User question:
 """.strip()
 
 
-def build_coach_response(question: str, summary: dict, subscriptions: list[dict], gemini_api_key: Optional[str] = None) -> dict:
-    """Return a small coaching response.
-
-    If `gemini_api_key` is provided it will be used; otherwise the loader will try
-    environment and local file locations.
-    """
+def _rules_response(question: str, summary: dict, subscriptions: list[dict]) -> dict:
     question_lower = (question or "").lower()
     recommendations: list[dict] = []
 
-    # Use provided key if present, else load
-    gemini_key = gemini_api_key or load_gemini_key()
-    gemini_prompt = _build_gemini_prompt(question, summary, subscriptions)
-    gemini_text = _call_gemini(gemini_prompt, gemini_key) if gemini_key else None
-
-    logger.info(
-        "Coach Gemini status: key_present=%s sdk_loaded=%s using_fallback=%s",
-        bool(gemini_key),
-        genai is not None,
-        gemini_text is None,
-    )
-
     category_totals = summary.get("category_totals", [])
     top_categories = category_totals[:3]
 
@@ -186,10 +423,89 @@ def build_coach_response(question: str, summary: dict, subscriptions: list[dict]
         f"estimated monthly subscription spend is ${summary.get('subscription_monthly_total', 0):,.2f}."
     )
 
-    using_gemini = bool(gemini_text)
+    return {"summary_text": summary_text, "recommendations": recommendations, "response_source": "rules"}
+
+
+def _gemini_response(text: str) -> dict:
+    return {"summary_text": text, "recommendations": [], "response_source": "gemini"}
+
 
-    return {
-        "summary_text": gemini_text or summary_text,
-        "recommendations": [] if using_gemini else recommendations,
-        "response_source": "gemini" if using_gemini else "rules",
-    }
+def build_coach_response(
+    question: str,
+    summary: dict,
+    subscriptions: list[dict],
+    gemini_api_key: Optional[str] = None,
+    generate: Optional[Generate] = None,
+) -> dict:
+    """Return a small coaching response.
+
+    If `gemini_api_key` is provided it will be used; otherwise the loader will try
+    environment and local file locations. `generate` replaces the Gemini call,
+    e.g. with a local stub; its answers are cached the same way.
+    """
+    # Use provided key if present, else load
+    gemini_key = gemini_api_key or load_gemini_key()
+    gemini_prompt = _build_gemini_prompt(question, summary, subscriptions)
+    gemini_text = _cached_generate(gemini_prompt, gemini_key, generate or _call_gemini) if gemini_key else None
+
+    logger.info(
+        "Coach Gemini status: key_present=%s sdk_loaded=%s using_fallback=%s",
+        bool(gemini_key),
+        genai is not None,
+        gemini_text is None,
+    )
+
+    if gemini_text:
+        return _gemini_response(gemini_text)
+    return _rules_response(question, summary, subscriptions)
+
+
+def stream_coach_response(
+    question: str,
+    summary: dict,
+    subscriptions: list[dict],
+    gemini_api_key: Optional[str] = None,
+    stream: Optional[StreamGenerate] = None,
+) -> Iterator[tuple[str, dict]]:
+    """Yield ``(event, data)`` pairs for a streamed coaching response.
+
+    The rules response comes first as ``fallback``, then the model's text as
+    it is produced, one ``delta`` (``{"text": ...}``) per chunk. The last
+    event, ``done``, carries what :func:`build_coach_response` would have
+    returned: the full model answer, or the rules response if generation was
+    unavailable, failed or stalled for ``COACH_TIMEOUT_SECONDS``. `stream`
+    replaces the Gemini streaming call, e.g. with a local stub.
+    """
+    rules = _rules_response(question, summary, subscriptions)
+    yield "fallback", rules
+
+    gemini_key = gemini_api_key or load_gemini_key()
+    if not gemini_key:
+        yield "done", rules
+        return
+
+    gemini_prompt = _build_gemini_prompt(question, summary, subscriptions)
+    cached = _RESPONSE_CACHE.get(prompt_fingerprint(gemini_prompt))
+    if cached is not None:
+        yield "delta", {"text": cached}
+        yield "done", _gemini_response(cached)
+        return
+
+    chunks: Queue = Queue()
+    future = _submit_generate(gemini_prompt, gemini_key, _forward_chunks(stream or _stream_gemini, chunks))
+    gemini_text = None
+    while future is not None:
+        try:
+            chunk = chunks.get(timeout=COACH_TIMEOUT_SECONDS)
+        except Empty:
+            logger.warning("Coach model stream stalled for %ss; answering from rules", COACH_TIMEOUT_SECONDS)
+            break
+        if chunk is _STREAM_END:
+            try:
+                gemini_text = future.result(timeout=COACH_TIMEOUT_SECONDS)
+            except Exception:
+                logger.warning("Coach model stream failed; answering from rules", exc_info=True)
+            break
+        yield "delta", {"text": chunk}
+
+    yield "done", _gemini_response(gemini_text) if gemini_text else rules
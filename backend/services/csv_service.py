@@ -2,9 +2,21 @@
 
 from __future__ import annotations
 
+import hashlib
+import warnings
+from dataclasses import dataclass, replace
 from io import BytesIO
+from threading import Lock
+from typing import IO, Iterator
 
+import numpy as np
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+try:
+    import pyarrow  # noqa: F401
+except Exception:
+    pyarrow = None
 
 
 DATE_COLUMNS = ["date", "transaction date", "posted date"]
@@ -13,11 +25,41 @@ DESCRIPTION_COLUMNS = ["description", "memo", "details", "notes"]
 AMOUNT_COLUMNS = ["amount", "debit", "transaction amount"]
 CREDIT_COLUMNS = ["credit", "deposit"]
 
+STREAM_CHUNK_ROWS = 50_000
+DATE_SAMPLE_SIZE = 200
+
 
 class CSVParseError(ValueError):
     """Raised when CSV cannot be normalized."""
 
 
+@dataclass(frozen=True)
+class CSVColumns:
+    """Parse plan for one CSV layout.
+
+    Column fields hold normalized source column names. ``amount_sign`` is -1
+    for banks that export debits as negative amounts, so that spending ends
+    up positive like everywhere else in the app.
+    """
+
+    date: str
+    merchant: str
+    description: str | None
+    amount: str | None
+    credit: str | None
+    date_format: str | None = None
+    amount_sign: int = 1
+    name: str | None = None
+
+
+# Header fingerprint -> parse plan. Seeded with known bank exports; layouts
+# detected from an upload are added after their first successful parse.
+BANK_PROFILES: dict[str, CSVColumns] = {}
+MAX_LEARNED_PROFILES = 1_000
+_learned_profiles: list[str] = []
+_PROFILES_LOCK = Lock()
+
+
 def _find_column(columns: list[str], candidates: list[str]) -> str | None:
     for candidate in candidates:
         if candidate in columns:
@@ -25,25 +67,31 @@ def _find_column(columns: list[str], candidates: list[str]) -> str | None:
     return None
 
 
-def parse_and_normalize_csv(file_bytes: bytes) -> pd.DataFrame:
-    if not file_bytes:
-        raise CSVParseError("Uploaded file is empty.")
+def _normalize_header(columns: list) -> list[str]:
+    return [str(col).strip().lower() for col in columns]
 
-    try:
-        df = pd.read_csv(BytesIO(file_bytes))
-    except Exception as exc:  # pandas parsing errors vary
-        raise CSVParseError(f"Unable to parse CSV: {exc}") from exc
 
-    if df.empty:
-        raise CSVParseError("CSV file has no rows.")
+def header_fingerprint(normalized_columns: list[str]) -> str:
+    return hashlib.sha1("\x1f".join(normalized_columns).encode("utf-8")).hexdigest()[:16]
 
-    original_columns = df.columns.tolist()
-    normalized_columns = [str(col).strip().lower() for col in original_columns]
-    df.columns = normalized_columns
 
+def register_profile(header: list, profile: CSVColumns) -> None:
+    """Register a parse plan for CSVs whose header row matches ``header``."""
+    BANK_PROFILES[header_fingerprint(_normalize_header(header))] = profile
+
+
+def _learn_profile(fingerprint: str, profile: CSVColumns) -> None:
+    with _PROFILES_LOCK:
+        if fingerprint not in BANK_PROFILES:
+            _learned_profiles.append(fingerprint)
+            while len(_learned_profiles) > MAX_LEARNED_PROFILES:
+                BANK_PROFILES.pop(_learned_profiles.pop(0), None)
+        BANK_PROFILES[fingerprint] = profile
+
+
+def resolve_columns(normalized_columns: list[str]) -> CSVColumns:
     date_col = _find_column(normalized_columns, DATE_COLUMNS)
     merchant_col = _find_column(normalized_columns, MERCHANT_COLUMNS)
-    description_col = _find_column(normalized_columns, DESCRIPTION_COLUMNS)
     amount_col = _find_column(normalized_columns, AMOUNT_COLUMNS)
     credit_col = _find_column(normalized_columns, CREDIT_COLUMNS)
 
@@ -51,32 +99,240 @@ def parse_and_normalize_csv(file_bytes: bytes) -> pd.DataFrame:
         raise CSVParseError("Could not find a date column.")
     if not merchant_col:
         raise CSVParseError("Could not find a merchant/description column.")
+    if not amount_col and not credit_col:
+        raise CSVParseError("Could not find amount/debit/credit column.")
 
-    working = pd.DataFrame()
-    working["date"] = pd.to_datetime(df[date_col], errors="coerce")
+    return CSVColumns(
+        date=date_col,
+        merchant=merchant_col,
+        description=_find_column(normalized_columns, DESCRIPTION_COLUMNS),
+        amount=amount_col,
+        credit=credit_col,
+    )
+
+
+def _date_sample(values: pd.Series) -> pd.Series:
+    sample = values.dropna().head(DATE_SAMPLE_SIZE).astype(str).str.strip()
+    return sample[sample != ""]
+
+
+def _format_fits(sample: pd.Series, date_format: str) -> bool:
+    return bool(pd.to_datetime(sample, format=date_format, errors="coerce").notna().all())
+
+
+def infer_date_format(values: pd.Series) -> str | None:
+    """Pick one strftime format that parses every value in a sample.
+
+    Returns ``None`` when no single format fits, in which case dates are
+    parsed by pandas' own inference.
+    """
+    sample = _date_sample(values)
+    tried: set[str] = set()
+    for value in sample.head(10):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            date_format = guess_datetime_format(value)
+        if not date_format or date_format in tried:
+            continue
+        tried.add(date_format)
+        if _format_fits(sample, date_format):
+            return date_format
+    return None
+
+
+def _with_date_format(columns: CSVColumns, values: pd.Series) -> CSVColumns:
+    # A profile's format is only checked against a small sample; inference
+    # runs when there is no format yet or the sample disagrees with it.
+    if columns.date_format and _format_fits(_date_sample(values), columns.date_format):
+        return columns
+    return replace(columns, date_format=infer_date_format(values))
 
-    if amount_col:
-        working["amount"] = pd.to_numeric(df[amount_col], errors="coerce")
-    elif credit_col:
-        working["amount"] = -pd.to_numeric(df[credit_col], errors="coerce")
+
+def _parse_dates(values: pd.Series, date_format: str | None) -> pd.Series:
+    """Parse dates to ``YYYY-MM-DD`` strings, with ``None`` for invalid ones.
+
+    Bank exports repeat the same few thousand dates, so each distinct value
+    is parsed and formatted once and the results are broadcast back.
+    """
+    codes, uniques = pd.factorize(values)
+    if date_format:
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=date_format, errors="coerce")
     else:
-        raise CSVParseError("Could not find amount/debit/credit column.")
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce")
+    formatted = parsed.dt.strftime("%Y-%m-%d").to_numpy(dtype=object)
+    formatted = np.append(formatted, None)  # code -1 marks a missing value
+    return pd.Series(formatted[codes], index=values.index, dtype=object)
+
+
+def _text(values: pd.Series) -> pd.Series:
+    # Engines disagree on empty cells: the C parser yields NaN, pyarrow None.
+    # Spell both the way the C parser always has, so stored merchants don't
+    # depend on the engine or on whether the upload was streamed.
+    # where() rather than fillna(), which warns about downcasting object columns.
+    return values.astype(object).where(values.notna(), "nan").astype(str).str.strip()
 
-    if credit_col and amount_col and credit_col in df.columns:
-        credits = pd.to_numeric(df[credit_col], errors="coerce").fillna(0)
-        working["amount"] = pd.to_numeric(df[amount_col], errors="coerce").fillna(0) - credits
 
-    working["merchant"] = df[merchant_col].astype(str).str.strip()
-    desc_series = df[description_col] if description_col else df[merchant_col]
-    working["description"] = desc_series.astype(str).str.strip()
+def _normalize_frame(df: pd.DataFrame, columns: CSVColumns) -> pd.DataFrame:
+    working = pd.DataFrame()
+    working["date"] = _parse_dates(df[columns.date], columns.date_format)
+
+    if columns.amount and columns.credit:
+        credits = pd.to_numeric(df[columns.credit], errors="coerce").fillna(0)
+        working["amount"] = pd.to_numeric(df[columns.amount], errors="coerce").fillna(0) - credits
+    elif columns.amount:
+        working["amount"] = pd.to_numeric(df[columns.amount], errors="coerce")
+    else:
+        working["amount"] = -pd.to_numeric(df[columns.credit], errors="coerce")
+    if columns.amount_sign < 0:
+        working["amount"] = 0.0 - working["amount"]
+
+    working["merchant"] = _text(df[columns.merchant])
+    working["description"] = _text(df[columns.description] if columns.description else df[columns.merchant])
 
     working = working.dropna(subset=["date", "amount"])
     working = working[working["merchant"] != ""]
 
+    working["amount"] = working["amount"].astype(float).round(2)
+
+    return working[["date", "merchant", "amount", "description"]]
+
+
+def _read_options(original_columns: list, columns: CSVColumns, numeric: bool = True) -> dict:
+    """``read_csv`` arguments that load only the resolved columns."""
+    source: dict[str, str] = {}
+    for original, normalized in zip(original_columns, _normalize_header(original_columns)):
+        source.setdefault(normalized, original)
+
+    numeric_columns = {columns.amount, columns.credit} - {None}
+    wanted = {columns.date, columns.merchant, columns.description, *numeric_columns} - {None}
+    return {
+        "usecols": [source[name] for name in wanted],
+        "dtype": {
+            source[name]: "float64" if numeric and name in numeric_columns else object
+            for name in wanted
+        },
+    }
+
+
+def _read_resolved(file_bytes: bytes, original_columns: list, columns: CSVColumns) -> pd.DataFrame:
+    # Cheapest first: native float parsing, with pyarrow when it is installed.
+    # Amount columns holding things like "$1,200" fail the float read and are
+    # re-read as text for to_numeric to coerce.
+    engines = ["pyarrow", "c"] if pyarrow is not None else ["c"]
+    last_error: Exception | None = None
+    for engine in engines:
+        for numeric in (True, False):
+            try:
+                return pd.read_csv(BytesIO(file_bytes), engine=engine, **_read_options(original_columns, columns, numeric))
+            except Exception as exc:  # pandas/pyarrow parsing errors vary
+                last_error = exc
+    raise CSVParseError(f"Unable to parse CSV: {last_error}") from last_error
+
+
+def parse_and_normalize_csv(file_bytes: bytes) -> pd.DataFrame:
+    if not file_bytes:
+        raise CSVParseError("Uploaded file is empty.")
+
+    try:
+        original_columns = pd.read_csv(BytesIO(file_bytes), nrows=0).columns.tolist()
+    except Exception as exc:  # pandas parsing errors vary
+        raise CSVParseError(f"Unable to parse CSV: {exc}") from exc
+
+    header = _normalize_header(original_columns)
+    fingerprint = header_fingerprint(header)
+    profile = BANK_PROFILES.get(fingerprint)
+    columns = profile or resolve_columns(header)
+    df = _read_resolved(file_bytes, original_columns, columns)
+
+    if df.empty:
+        raise CSVParseError("CSV file has no rows.")
+
+    df.columns = _normalize_header(df.columns.tolist())
+    columns = _with_date_format(columns, df[columns.date])
+    working = _normalize_frame(df, columns)
+
     if working.empty:
         raise CSVParseError("No valid transaction rows found after normalization.")
 
-    working["date"] = working["date"].dt.strftime("%Y-%m-%d")
-    working["amount"] = working["amount"].astype(float).round(2)
+    if columns != profile:
+        _learn_profile(fingerprint, columns)
+    return working
 
-    return working[["date", "merchant", "amount", "description"]]
+
+def iter_normalized_csv(stream: IO[bytes], chunksize: int = STREAM_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Parse a CSV stream ``chunksize`` rows at a time.
+
+    Columns are resolved once from the header and each chunk is normalized
+    exactly like :func:`parse_and_normalize_csv`, so only one chunk of raw
+    and normalized rows is held in memory at a time. The date format is
+    inferred once from the first chunk. Chunks left empty after
+    normalization are skipped.
+    """
+    try:
+        start = stream.tell()
+        original_columns = pd.read_csv(stream, nrows=0).columns.tolist()
+        stream.seek(start)
+    except Exception as exc:  # pandas parsing errors vary
+        raise CSVParseError(f"Unable to parse CSV: {exc}") from exc
+
+    header = _normalize_header(original_columns)
+    fingerprint = header_fingerprint(header)
+    profile = BANK_PROFILES.get(fingerprint)
+    columns = profile or resolve_columns(header)
+
+    # Text-typed amounts keep odd values (e.g. "$12.00") from failing a whole
+    # chunk mid-stream; to_numeric coerces them per chunk instead.
+    try:
+        reader = pd.read_csv(stream, chunksize=chunksize, **_read_options(original_columns, columns, numeric=False))
+        first = next(reader, None)
+    except Exception as exc:  # pandas parsing errors vary
+        raise CSVParseError(f"Unable to parse CSV: {exc}") from exc
+
+    if first is None or first.empty:
+        raise CSVParseError("CSV file has no rows.")
+
+    first.columns = _normalize_header(first.columns.tolist())
+    columns = _with_date_format(columns, first[columns.date])
+
+    produced = False
+    chunk: pd.DataFrame | None = first
+    with reader:
+        while chunk is not None:
+            chunk.columns = _normalize_header(chunk.columns.tolist())
+            working = _normalize_frame(chunk, columns)
+            if not working.empty:
+                produced = True
+                yield working
+            try:
+                chunk = next(reader, None)
+            except Exception as exc:  # pandas parsing errors vary
+                raise CSVParseError(f"Unable to parse CSV: {exc}") from exc
+
+    if not produced:
+        raise CSVParseError("No valid transaction rows found after normalization.")
+    if columns != profile:
+        _learn_profile(fingerprint, columns)
+
+
+# Known exports. Several banks write debits as negative amounts, and not all
+# of them use a header the generic column detection recognizes.
+register_profile(
+    ["Details", "Posting Date", "Description", "Amount", "Type", "Balance", "Check or Slip #"],
+    CSVColumns("posting date", "description", "description", "amount", None, "%m/%d/%Y", -1, "Chase checking"),
+)
+register_profile(
+    ["Transaction Date", "Post Date", "Description", "Category", "Type", "Amount", "Memo"],
+    CSVColumns("transaction date", "description", "description", "amount", None, "%m/%d/%Y", -1, "Chase credit card"),
+)
+register_profile(
+    ["Date", "Description", "Amount", "Running Bal."],
+    CSVColumns("date", "description", "description", "amount", None, "%m/%d/%Y", -1, "Bank of America"),
+)
+register_profile(
+    ["Transaction Date", "Posted Date", "Card No.", "Description", "Category", "Debit", "Credit"],
+    CSVColumns("transaction date", "description", "description", "debit", "credit", "%Y-%m-%d", 1, "Capital One"),
+)
+register_profile(
+    ["Trans. Date", "Post Date", "Description", "Amount", "Category"],
+    CSVColumns("trans. date", "description", "description", "amount", None, "%m/%d/%Y", 1, "Discover"),
+)
@@ -0,0 +1,350 @@
+"""Dataset rebuild and incremental recompute."""
+
+from __future__ import annotations
+
+import uuid
+from bisect import bisect_left, bisect_right
+from typing import Callable, Collection, Iterable
+
+import numpy as np
+import pandas as pd
+
+from services.calendar_service import build_calendar_plan, is_calendar_row
+from services.categorize_service import categorize_transactions
+from services.recurring_service import detect_subscriptions
+from services.summary_service import build_rollup, merge_rollup, slice_rollup, summary_from_rollup
+from services.table_service import TRANSACTION_COLUMNS, TransactionTable
+
+_TEXT_COLUMNS = ["date", "description", "merchant", "category", "source", "next_charge_date"]
+# Columns read by recurrence detection and by rollups; re-detecting a
+# merchant or summarizing a partial month decodes only these.
+_DETECTION_COLUMNS = ("date", "merchant", "amount")
+_ROLLUP_COLUMNS = ("date", "category", "amount")
+
+
+def coerce_transactions(rows: list[dict] | pd.DataFrame | TransactionTable) -> pd.DataFrame:
+    if isinstance(rows, TransactionTable):
+        # Stored tables were coerced when they were built.
+        return rows.to_frame()
+    tx = rows.copy() if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows or [])
+    if tx.empty:
+        return pd.DataFrame(columns=TRANSACTION_COLUMNS)
+
+    for col in TRANSACTION_COLUMNS:
+        if col not in tx.columns:
+            if col == "amount":
+                tx[col] = 0.0
+            elif col == "interval_days":
+                tx[col] = 0
+            else:
+                tx[col] = ""
+
+    # Fill gaps before casting so a missing value reads the same ("") whether
+    # the column was absent from every row or only from some of them.
+    tx["amount"] = pd.to_numeric(tx["amount"], errors="coerce").fillna(0.0).astype(float)
+    tx["tx_id"] = tx["tx_id"].fillna("").astype(str)
+    tx.loc[tx["tx_id"].str.strip() == "", "tx_id"] = [str(uuid.uuid4()) for _ in range((tx["tx_id"].str.strip() == "").sum())]
+    for col in _TEXT_COLUMNS:
+        tx[col] = tx[col].fillna("").astype(str)
+    tx["interval_days"] = pd.to_numeric(tx["interval_days"], errors="coerce").fillna(0).astype(int)
+    return tx[TRANSACTION_COLUMNS]
+
+
+def _manual_subscription(transaction: dict) -> dict | None:
+    is_manual_subscription = (
+        transaction.get("source") == "manual_subscription"
+        or str(transaction.get("category", "")).lower() == "subscription"
+    )
+    amount = float(transaction.get("amount", 0) or 0)
+    merchant = str(transaction.get("merchant", "") or "").strip()
+    if not is_manual_subscription or amount <= 0 or not merchant:
+        return None
+
+    interval_days = max(1, int(float(transaction.get("interval_days", 30) or 30)))
+    monthly_cost = round(amount * (30 / interval_days), 2)
+    return {
+        "merchant": merchant,
+        "interval_days": interval_days,
+        "monthly_cost": monthly_cost,
+        "next_charge_date": transaction.get("next_charge_date") or transaction.get("date", ""),
+        "confidence": None,
+    }
+
+
+def _sort_detected(subscriptions: list[dict]) -> list[dict]:
+    # Same order detect_subscriptions produces: merchant order from the groupby,
+    # then a stable sort by monthly cost.
+    ordered = sorted(subscriptions, key=lambda item: item["merchant"])
+    ordered.sort(key=lambda item: item["monthly_cost"], reverse=True)
+    return ordered
+
+
+def find_transaction_positions(dataset: dict, tx_id: str) -> list[int]:
+    """Return the positions of the rows with ``tx_id``."""
+    return locate_transactions(dataset, [tx_id]).get(tx_id, [])
+
+
+def locate_transactions(dataset: dict, tx_ids: Iterable[str]) -> dict[str, list[int]]:
+    """Map each of ``tx_ids`` present in the dataset to its row positions."""
+    return dataset["transactions"].tx_id_positions(tx_ids)
+
+
+class DatasetBuilder:
+    """Build a dataset payload from transactions fed in one or more chunks.
+
+    ``add`` coerces and categorizes a chunk, folds it into the rollup and
+    returns it as a :class:`TransactionTable`; ``finish`` runs recurrence
+    detection and returns the remaining dataset fields. Only the columns
+    recurrence detection needs are retained between chunks, so large
+    imports can be streamed to storage chunk by chunk.
+    """
+
+    def __init__(self, goals: dict | None = None):
+        self.goals = goals or {}
+        self.rollup: dict = {}
+        self.row_count = 0
+        self._manual_rows: list[int] = []
+        self._manual_subscriptions: list[dict] = []
+        self._calendar_rows: list[int] = []
+        self._calendar_transactions: list[dict] = []
+        self._recurring_candidates: list[pd.DataFrame] = []
+
+    def add(self, transactions: list[dict] | pd.DataFrame) -> TransactionTable:
+        categorized = categorize_transactions(coerce_transactions(transactions))
+        table = TransactionTable.from_frame(categorized)
+
+        # Only rows tagged as manual subscriptions or planned payments can
+        # feed the subscription list or the calendar; check just those.
+        candidates = categorized["source"].isin(["manual_subscription", "one_time_future_payment"]) | (
+            categorized["category"].str.lower() == "subscription"
+        )
+        for offset in np.flatnonzero(candidates.to_numpy()).tolist():
+            transaction = table[offset]
+            subscription = _manual_subscription(transaction)
+            if subscription is not None:
+                self._manual_rows.append(self.row_count + offset)
+                self._manual_subscriptions.append(subscription)
+            if is_calendar_row(transaction):
+                self._calendar_rows.append(self.row_count + offset)
+                self._calendar_transactions.append(transaction)
+
+        self.rollup = merge_rollup(self.rollup, build_rollup(categorized))
+        self._recurring_candidates.append(categorized.loc[categorized["amount"] > 0, ["date", "merchant", "amount"]])
+        self.row_count += len(table)
+        return table
+
+    def finish(self, explicit_subscriptions: list[dict] | None = None) -> dict:
+        # If the client provided explicit subscriptions (from manual entry), trust and use them.
+        if isinstance(explicit_subscriptions, list) and explicit_subscriptions:
+            detected = explicit_subscriptions
+            detected_count = None
+        else:
+            candidates = [frame for frame in self._recurring_candidates if not frame.empty]
+            detected = detect_subscriptions(pd.concat(candidates, ignore_index=True)) if candidates else []
+            detected_count = len(detected)
+        self._recurring_candidates = []
+        subscriptions = [*detected, *self._manual_subscriptions]
+
+        return {
+            "subscriptions": subscriptions,
+            "summary": summary_from_rollup(self.rollup, subscriptions),
+            "goals": self.goals,
+            "rollup": self.rollup,
+            "subscription_index": {
+                "detected_count": detected_count,
+                "manual_rows": self._manual_rows,
+                "calendar_rows": self._calendar_rows,
+            },
+            "calendar": build_calendar_plan(subscriptions, self._calendar_transactions),
+        }
+
+
+def rebuild_dataset(
+    transactions: list[dict] | pd.DataFrame,
+    goals: dict | None = None,
+    explicit_subscriptions: list[dict] | None = None,
+) -> dict:
+    builder = DatasetBuilder(goals)
+    table = builder.add(transactions)
+    return {"transactions": table, **builder.finish(explicit_subscriptions)}
+
+
+def dataset_rollup(dataset: dict) -> dict:
+    """Return the stored month x category rollup of ``dataset``.
+
+    Datasets saved before the rollup was stored get one built from their
+    transactions; it is persisted by the next write.
+    """
+    rollup = dataset.get("rollup")
+    if rollup is None:
+        rollup = build_rollup(coerce_transactions(dataset["transactions"]))
+    return rollup
+
+
+def dataset_calendar(dataset: dict) -> dict:
+    """Return the stored calendar plan of ``dataset``, building it if absent."""
+    plan = dataset.get("calendar")
+    if plan is None:
+        plan = build_calendar_plan(dataset.get("subscriptions", []), dataset["transactions"])
+    return plan
+
+
+# Dataset fields recomputed from the transactions by every edit.
+DERIVED_FIELDS = frozenset({"subscriptions", "summary", "rollup", "subscription_index", "calendar"})
+
+
+def has_incremental_state(dataset: dict) -> bool:
+    """Whether :func:`apply_transaction_changes` can patch ``dataset`` in place.
+
+    Without it edits rebuild the whole dataset, re-coercing every row.
+    """
+    index = dataset.get("subscription_index") or {}
+    return dataset.get("rollup") is not None and index.get("detected_count") is not None
+
+
+def apply_transaction_changes(
+    dataset: dict,
+    *,
+    appends: Iterable[dict] = (),
+    updates: dict[int, dict] | None = None,
+    deletes: Iterable[int] = (),
+) -> dict:
+    """Apply row edits to a stored dataset without a full rebuild.
+
+    ``updates`` maps positions in ``dataset["transactions"]`` to replacement
+    rows and ``deletes`` lists positions to drop; ``appends`` are added at the
+    end. Only the changed rows are coerced and categorized, recurrence
+    detection re-runs for the merchants they touch, and the rollup is patched
+    with the rows' deltas. The result matches :func:`rebuild_dataset` on the
+    edited list. Datasets saved before the incremental state existed, or
+    built from client-provided subscriptions, fall back to a full rebuild.
+    """
+    updates = updates or {}
+    appends = list(appends)
+    deleted = sorted(set(deletes) - set(updates))
+    transactions = dataset["transactions"]
+
+    if not has_incremental_state(dataset):
+        deleted_set = set(deleted)
+        edited = [
+            updates.get(position, row)
+            for position, row in enumerate(transactions)
+            if position not in deleted_set
+        ]
+        return rebuild_dataset([*edited, *appends], dataset.get("goals", {}))
+
+    rollup = dataset["rollup"]
+    index = dataset["subscription_index"]
+    detected_count = index["detected_count"]
+    new_frame = categorize_transactions(coerce_transactions([*updates.values(), *appends]))
+    changes = TransactionTable.from_frame(new_frame)
+    new_rows = changes.to_records()
+    updated_rows = dict(zip(updates, new_rows))
+    appended_rows = new_rows[len(updates):]
+    old_rows = [transactions[position] for position in [*updates, *deleted]]
+
+    rollup = merge_rollup(rollup, build_rollup(coerce_transactions(old_rows)), sign=-1)
+    rollup = merge_rollup(rollup, build_rollup(new_frame))
+
+    next_transactions = transactions.edit(changes, list(updates), deleted)
+    deleted_set = set(deleted)
+    first_appended = len(next_transactions) - len(appended_rows)
+
+    # Manual subscriptions and calendar rows follow transaction order;
+    # shift surviving positions past the deleted rows, re-check the edited
+    # ones, then add new rows.
+    touched = deleted_set | set(updated_rows)
+
+    def tracked_rows(positions: Iterable[int], matches: Callable[[dict], bool]) -> list[int]:
+        rows = [position - bisect_left(deleted, position) for position in positions if position not in touched]
+        rows.extend(position - bisect_left(deleted, position) for position, row in updated_rows.items() if matches(row))
+        rows.extend(first_appended + offset for offset, row in enumerate(appended_rows) if matches(row))
+        return sorted(rows)
+
+    manual_rows = tracked_rows(index.get("manual_rows", []), lambda row: _manual_subscription(row) is not None)
+    manual_subscriptions = [_manual_subscription(next_transactions[position]) for position in manual_rows]
+    if "calendar_rows" in index:
+        calendar_rows = tracked_rows(index["calendar_rows"], is_calendar_row)
+    else:
+        calendar_rows = [position for position, row in enumerate(next_transactions) if is_calendar_row(row)]
+
+    affected = {str(row.get("merchant", "")) for row in [*old_rows, *new_rows]}
+    merchant_rows = next_transactions.positions_in("merchant", affected)
+    redetected = (
+        detect_subscriptions(next_transactions.take(merchant_rows).to_frame(_DETECTION_COLUMNS)) if len(merchant_rows) else []
+    )
+    detected = [item for item in dataset["subscriptions"][:detected_count] if item["merchant"] not in affected]
+    detected = _sort_detected([*detected, *redetected])
+
+    subscriptions = [*detected, *manual_subscriptions]
+    return {
+        **dataset,
+        "transactions": next_transactions,
+        "subscriptions": subscriptions,
+        "summary": summary_from_rollup(rollup, subscriptions),
+        "rollup": rollup,
+        "subscription_index": {
+            "detected_count": len(detected),
+            "manual_rows": manual_rows,
+            "calendar_rows": calendar_rows,
+        },
+        "calendar": build_calendar_plan(subscriptions, [next_transactions[position] for position in calendar_rows]),
+    }
+
+
+def summarize_range(
+    dataset: dict,
+    start: str | None = None,
+    end: str | None = None,
+    categories: Collection[str] | None = None,
+) -> dict:
+    """Summarize the transactions dated within ``[start, end]``.
+
+    ``start`` and ``end`` are ISO dates and either may be omitted;
+    ``categories`` limits the summary to those categories. Whole months come
+    straight from the rollup. Only the rows of a partially covered first or
+    last month are read, found by bisecting the date index (or the category
+    index when filtering by category).
+    """
+    rollup = dataset_rollup(dataset)
+    transactions = dataset["transactions"]
+    date_index, category_index = transactions.date_index, transactions.category_index
+    start_month = start[:7] if start else None
+    end_month = end[:7] if end else None
+
+    # The first and last months are partial unless the range covers them
+    # end to end; every month in between is whole.
+    windows: list[tuple[str, str]] = []
+    if start_month and start_month == end_month:
+        if start > f"{start_month}-01" or end < f"{end_month}-31":
+            windows.append((start, end))
+    else:
+        if start and start > f"{start_month}-01":
+            windows.append((start, f"{start_month}-31"))
+        if end and end < f"{end_month}-31":
+            windows.append((f"{end_month}-01", end))
+    partial_months = {window_start[:7] for window_start, _ in windows}
+
+    whole = slice_rollup(rollup, start_month, end_month, categories)
+    whole = {month: cells for month, cells in whole.items() if month not in partial_months}
+
+    if categories is None:
+        indexes = [date_index]
+    else:
+        indexes = [category_index.get(category, []) for category in categories]
+
+    def row_date(position: int) -> str:
+        return transactions.cell("date", position)
+
+    positions = []
+    for index in indexes:
+        for window_start, window_end in windows:
+            low = bisect_left(index, window_start, key=row_date)
+            high = bisect_right(index, window_end, key=row_date)
+            positions.extend(index[low:high])
+
+    if positions:
+        rollup = merge_rollup(whole, build_rollup(transactions.take(positions).to_frame(_ROLLUP_COLUMNS)))
+    else:
+        rollup = whole
+    return summary_from_rollup(rollup, dataset.get("subscriptions", []))
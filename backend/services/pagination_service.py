@@ -0,0 +1,101 @@
+"""Cursor-paginated transaction listing."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import heapq
+import json
+from bisect import bisect_left, bisect_right
+from typing import Any, Collection, Iterable, Mapping, Protocol, Sequence
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class RowSource(Protocol):
+    """Random access to a dataset's rows plus its row indexes."""
+
+    date_index: Sequence[int]
+    category_index: Mapping[str, Sequence[int]]
+
+    def row(self, position: int) -> dict[str, Any]: ...
+
+
+def encode_cursor(row: dict[str, Any]) -> str:
+    key = [str(row.get("date", "")), str(row.get("tx_id", ""))]
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Return the ``(date, tx_id)`` key of a cursor; raise ``ValueError`` if malformed."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (UnicodeEncodeError, binascii.Error, json.JSONDecodeError) as exc:
+        raise ValueError("Malformed cursor.") from exc
+    if not (isinstance(key, list) and len(key) == 2 and all(isinstance(part, str) for part in key)):
+        raise ValueError("Malformed cursor.")
+    return key[0], key[1]
+
+
+def list_transactions_page(
+    rows: RowSource,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: tuple[str, str] | None = None,
+    descending: bool = False,
+    start: str | None = None,
+    end: str | None = None,
+    categories: Collection[str] | None = None,
+    query: str | None = None,
+    fields: Sequence[str] | None = None,
+) -> dict:
+    """Return one page of transactions ordered by ``(date, tx_id)``.
+
+    ``start``/``end`` (ISO dates), ``categories`` and the cursor are applied
+    by bisecting the date index, or the category indexes merged in order, so
+    only rows on or near the page are read. ``query`` is a case-insensitive
+    substring match on merchant and description and is checked row by row
+    while the page fills. ``fields`` projects each returned row.
+    """
+
+    def row_date(position: int) -> str:
+        return str(rows.row(position).get("date", ""))
+
+    def row_key(position: int) -> tuple[str, str]:
+        row = rows.row(position)
+        return str(row.get("date", "")), str(row.get("tx_id", ""))
+
+    if categories is None:
+        indexes = [rows.date_index]
+    else:
+        indexes = [rows.category_index.get(category, ()) for category in categories]
+
+    streams: list[Iterable[int]] = []
+    for index in indexes:
+        low = bisect_left(index, start, key=row_date) if start else 0
+        high = bisect_right(index, end, key=row_date) if end else len(index)
+        if cursor is not None and descending:
+            high = min(high, bisect_left(index, cursor, key=row_key))
+        elif cursor is not None:
+            low = max(low, bisect_right(index, cursor, key=row_key))
+        window = index[low:high]
+        streams.append(reversed(window) if descending else window)
+    positions = streams[0] if len(streams) == 1 else heapq.merge(*streams, key=row_key, reverse=descending)
+
+    needle = query.lower() if query else None
+    page: list[dict[str, Any]] = []
+    has_more = False
+    for position in positions:
+        row = rows.row(position)
+        if needle and needle not in f"{row.get('merchant', '')} {row.get('description', '')}".lower():
+            continue
+        if len(page) == limit:
+            has_more = True
+            break
+        page.append(row)
+
+    return {
+        "transactions": [{field: row.get(field) for field in fields} for row in page] if fields else page,
+        "next_cursor": encode_cursor(page[-1]) if has_more else None,
+    }
@@ -2,17 +2,20 @@
 
 from __future__ import annotations
 
-from datetime import timedelta
-
 import numpy as np
 import pandas as pd
 
 TARGET_INTERVALS = [7, 14, 30]
 TOLERANCE_DAYS = 3
 
+_DAY_NS = 86_400_000_000_000
+_NAT = np.iinfo(np.int64).min
+
 
-def _closest_interval(interval: float) -> int:
-    return min(TARGET_INTERVALS, key=lambda target: abs(target - interval))
+def _closest_intervals(intervals: np.ndarray) -> np.ndarray:
+    """Nearest entry of ``TARGET_INTERVALS`` for each value; ties go to the first."""
+    targets = np.asarray(TARGET_INTERVALS, dtype=float)
+    return targets[np.abs(intervals[:, None] - targets[None, :]).argmin(axis=1)]
 
 
 def _confidence_from_std(stddev: float) -> float:
@@ -20,47 +23,88 @@ def _confidence_from_std(stddev: float) -> float:
     return round(float(score), 2)
 
 
-def detect_subscriptions(df: pd.DataFrame) -> list[dict]:
-    if df.empty:
-        return []
+def _population_std(gaps: np.ndarray) -> float:
+    # Same arithmetic (and summation order) as Series.std(ddof=0), which is
+    # what np.std dispatched to on the per-merchant gap series.
+    values = gaps.astype(np.float64)
+    mean = values.sum(dtype=np.float64) / len(values)
+    return float(np.sqrt(((mean - values) ** 2).sum(dtype=np.float64) / len(values)))
 
-    tx = df.copy()
-    tx["parsed_date"] = pd.to_datetime(tx["date"])
-    tx = tx[tx["amount"] > 0]
 
-    subscriptions: list[dict] = []
+def detect_subscriptions(df: pd.DataFrame) -> list[dict]:
+    """Detect merchants charged at a roughly weekly, biweekly or monthly cadence.
 
-    for merchant, group in tx.groupby("merchant"):
-        if len(group) < 3:
-            continue
+    Positive charges are sorted once by (merchant, date). Gaps, counts and
+    medians are then computed for every merchant at once on flat arrays, and
+    only merchants whose median gap lands near a target interval are turned
+    into subscriptions.
+    """
+    if df.empty:
+        return []
 
-        group_sorted = group.sort_values("parsed_date")
-        gaps = group_sorted["parsed_date"].diff().dropna().dt.days
-        if len(gaps) < 2:
-            continue
+    parsed_dates = pd.to_datetime(df["date"])
+    positive = (df["amount"] > 0).to_numpy()
+    codes, merchants = pd.factorize(df["merchant"].to_numpy(dtype=object)[positive], sort=True)
+    dates = parsed_dates.to_numpy(dtype="datetime64[ns]")[positive].view(np.int64)
+    amounts = df["amount"].to_numpy(dtype=np.float64)[positive]
+
+    # Rows without a merchant are left out, as groupby would; NaT dates sort
+    # last within their merchant.
+    has_merchant = codes >= 0
+    codes, dates, amounts = codes[has_merchant], dates[has_merchant], amounts[has_merchant]
+    if not len(codes):
+        return []
+    order = np.lexsort((np.where(dates == _NAT, np.iinfo(np.int64).max, dates), codes))
+    codes, dates, amounts = codes[order], dates[order], amounts[order]
+
+    group_count = len(merchants)
+    sizes = np.bincount(codes, minlength=group_count)
+    starts = np.cumsum(sizes) - sizes
+    dated = dates != _NAT
+    dated_counts = np.bincount(codes[dated], minlength=group_count)
+
+    # Day gaps between consecutive dated charges of the same merchant.
+    consecutive = np.zeros(len(codes), dtype=bool)
+    consecutive[1:] = (codes[1:] == codes[:-1]) & dated[1:] & dated[:-1]
+    day_gaps = np.zeros(len(codes), dtype=np.int64)
+    day_gaps[1:] = (dates[1:] - dates[:-1]) // _DAY_NS
+    gap_codes = codes[consecutive]
+    gaps = day_gaps[consecutive]
+    gap_counts = np.bincount(gap_codes, minlength=group_count)
+    gap_starts = np.cumsum(gap_counts) - gap_counts
+
+    candidates = np.flatnonzero((sizes >= 3) & (gap_counts >= 2))
+    if not len(candidates):
+        return []
 
-        median_gap = float(np.median(gaps))
-        closest = _closest_interval(median_gap)
-        if abs(median_gap - closest) > TOLERANCE_DAYS:
-            continue
+    # Grouped median: sort gaps within each merchant and average the middle pair.
+    sorted_gaps = gaps[np.lexsort((gaps, gap_codes))]
+    counts = gap_counts[candidates]
+    low = sorted_gaps[gap_starts[candidates] + (counts - 1) // 2]
+    high = sorted_gaps[gap_starts[candidates] + counts // 2]
+    median_gaps = (low + high) / 2.0
 
-        stddev = float(np.std(gaps))
-        confidence = _confidence_from_std(stddev)
+    keep = np.abs(median_gaps - _closest_intervals(median_gaps)) <= TOLERANCE_DAYS
+    candidates, median_gaps = candidates[keep], median_gaps[keep]
+    interval_days = np.rint(median_gaps).astype(np.int64)
 
-        interval_days = int(round(median_gap))
-        avg_amount = float(group_sorted["amount"].mean())
-        monthly_cost = avg_amount * (30 / interval_days) if interval_days > 0 else avg_amount
+    last_dates = dates[starts[candidates] + dated_counts[candidates] - 1]
+    next_charge_dates = pd.to_datetime(last_dates + interval_days * _DAY_NS).strftime("%Y-%m-%d")
 
-        last_date = group_sorted["parsed_date"].max().to_pydatetime()
-        next_charge_date = (last_date + timedelta(days=interval_days)).strftime("%Y-%m-%d")
+    subscriptions: list[dict] = []
+    for group, interval, next_charge_date in zip(candidates.tolist(), interval_days.tolist(), next_charge_dates):
+        stddev = _population_std(gaps[gap_starts[group] : gap_starts[group] + gap_counts[group]])
+        group_amounts = amounts[starts[group] : starts[group] + sizes[group]]
+        avg_amount = float(group_amounts.sum(dtype=np.float64) / len(group_amounts))
+        monthly_cost = avg_amount * (30 / interval) if interval > 0 else avg_amount
 
         subscriptions.append(
             {
-                "merchant": merchant,
-                "interval_days": interval_days,
+                "merchant": merchants[group],
+                "interval_days": interval,
                 "monthly_cost": round(monthly_cost, 2),
                 "next_charge_date": next_charge_date,
-                "confidence": confidence,
+                "confidence": _confidence_from_std(stddev),
             }
         )
 
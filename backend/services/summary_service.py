@@ -2,73 +2,170 @@
 
 from __future__ import annotations
 
+from typing import Collection
+
+import numpy as np
 import pandas as pd
 
+# Rollup sums are kept in integer micro-units so that adding and removing rows
+# is exact and an incrementally maintained rollup equals a fresh one.
+MICROS = 1_000_000
+# datetime64[M] counts months from 1970-01; shift keys to start at 0001-01.
+_MONTH_OFFSET = -(1970 - 1) * 12
 
-def build_summary(df: pd.DataFrame, subscriptions: list[dict]) -> dict:
-    tx = df.copy()
-    tx["parsed_date"] = pd.to_datetime(tx["date"])
-    tx["month"] = tx["parsed_date"].dt.strftime("%Y-%m")
-    tx["expense_amount"] = tx["amount"].clip(lower=0)
-    tx["income_amount"] = (-tx["amount"]).clip(lower=0)
 
-    spending = tx[tx["amount"] > 0]
+def _to_amount(micros: int) -> float:
+    return round(micros / MICROS, 2)
 
-    if spending.empty:
-        biggest_category = {"name": "N/A", "amount": 0}
-        category_totals = []
-        monthly_totals = []
-        total_spent_this_month = 0.0
-    else:
-        latest_month = spending["month"].max()
-        month_spend = spending[spending["month"] == latest_month]["amount"].sum()
-        total_spent_this_month = round(float(month_spend), 2)
-
-        category_series = spending.groupby("category")["amount"].sum().sort_values(ascending=False)
-        category_totals = [
-            {"category": category, "amount": round(float(amount), 2)}
-            for category, amount in category_series.items()
-        ]
 
-        if category_totals:
-            biggest_category = {
-                "name": category_totals[0]["category"],
-                "amount": category_totals[0]["amount"],
-            }
-        else:
-            biggest_category = {"name": "N/A", "amount": 0}
+def _month_codes(dates: pd.Series) -> np.ndarray:
+    """Integer month key (months since 0001-01) for each date, or -1 if missing.
+
+    Each distinct date is parsed once; the integer month is broadcast back
+    to its rows, so no per-row string formatting is needed.
+    """
+    codes, uniques = pd.factorize(dates)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object)).to_numpy().astype("datetime64[M]")
+    months = np.where(np.isnat(parsed), -1, parsed.view(np.int64) - _MONTH_OFFSET)
+    return np.append(months, -1)[codes]
+
+
+def build_rollup(df: pd.DataFrame) -> dict[str, dict[str, list[int]]]:
+    """Aggregate transactions into ``{month: {category: cell}}``.
 
-        monthly_series = spending.groupby("month")["amount"].sum().sort_index()
-        monthly_totals = [
-            {"month": month, "amount": round(float(amount), 2)}
-            for month, amount in monthly_series.items()
+    Each cell is ``[count, spend_count, expense, income]``: the row count, the
+    number of rows with a positive amount, and expense/income totals in
+    micro-units. Cells are additive, so the rollup of a dataset can be updated
+    by merging the rollup of changed rows into it. Rows without a date are
+    left out.
+
+    All four measures are accumulated in one ``bincount`` pass per measure
+    over a combined (month, category) key.
+    """
+    if df.empty:
+        return {}
+
+    month_codes = _month_codes(df["date"])
+    dated = month_codes >= 0
+    months, month_index = np.unique(month_codes[dated], return_inverse=True)
+    category_index, categories = pd.factorize(df["category"].astype(str).to_numpy(dtype=object)[dated])
+    if not len(months):
+        return {}
+
+    amount = df["amount"].to_numpy(dtype=np.float64)[dated]
+    keys = month_index * len(categories) + category_index
+    size = len(months) * len(categories)
+    # Micro-unit sums stay well inside float64's exact integer range.
+    count = np.bincount(keys, minlength=size)
+    spend_count = np.bincount(keys, weights=amount > 0, minlength=size)
+    expense = np.bincount(keys, weights=np.rint(np.clip(amount, 0, None) * MICROS), minlength=size)
+    income = np.bincount(keys, weights=np.rint(np.clip(-amount, 0, None) * MICROS), minlength=size)
+
+    labels = np.datetime_as_string((months + _MONTH_OFFSET).astype("datetime64[M]"), unit="M")
+    rollup: dict[str, dict[str, list[int]]] = {}
+    for key in np.flatnonzero(count).tolist():
+        month, category = divmod(key, len(categories))
+        rollup.setdefault(str(labels[month]), {})[str(categories[category])] = [
+            int(count[key]),
+            int(spend_count[key]),
+            int(expense[key]),
+            int(income[key]),
         ]
+    return rollup
 
-    if tx.empty:
-        monthly_cashflow = []
-        total_income_this_month = 0.0
-        net_cashflow_this_month = 0.0
-    else:
-        latest_month_all = tx["month"].max()
-        month_slice = tx[tx["month"] == latest_month_all]
-        total_income_this_month = round(float(month_slice["income_amount"].sum()), 2)
-        net_cashflow_this_month = round(float(total_income_this_month - month_slice["expense_amount"].sum()), 2)
-
-        cashflow_series = (
-            tx.groupby("month")[["expense_amount", "income_amount"]]
-            .sum()
-            .sort_index()
-            .reset_index()
-        )
-        monthly_cashflow = [
+
+def merge_rollup(
+    base: dict[str, dict[str, list[int]]],
+    delta: dict[str, dict[str, list[int]]],
+    sign: int = 1,
+) -> dict[str, dict[str, list[int]]]:
+    """Return ``base`` with ``delta`` added (``sign=1``) or removed (``sign=-1``)."""
+    merged = {month: {category: list(cell) for category, cell in cells.items()} for month, cells in base.items()}
+    for month, cells in delta.items():
+        month_cells = merged.setdefault(month, {})
+        for category, cell in cells.items():
+            current = month_cells.get(category, [0, 0, 0, 0])
+            updated = [value + sign * change for value, change in zip(current, cell)]
+            if updated[0] <= 0:
+                month_cells.pop(category, None)
+            else:
+                month_cells[category] = updated
+        if not month_cells:
+            merged.pop(month)
+    return merged
+
+
+def slice_rollup(
+    rollup: dict[str, dict[str, list[int]]],
+    start_month: str | None = None,
+    end_month: str | None = None,
+    categories: Collection[str] | None = None,
+) -> dict[str, dict[str, list[int]]]:
+    """Return the cells of ``rollup`` for months in ``[start_month, end_month]``.
+
+    Months are ``YYYY-MM`` labels and either bound may be omitted;
+    ``categories`` keeps only those categories. The cost depends on the number
+    of months and categories, not on the number of transactions.
+    """
+    sliced: dict[str, dict[str, list[int]]] = {}
+    for month, cells in rollup.items():
+        if (start_month and month < start_month) or (end_month and month > end_month):
+            continue
+        if categories is not None:
+            cells = {category: cell for category, cell in cells.items() if category in categories}
+        if cells:
+            sliced[month] = cells
+    return sliced
+
+
+def summary_from_rollup(rollup: dict[str, dict[str, list[int]]], subscriptions: list[dict]) -> dict:
+    """Build the dashboard summary from a month x category rollup."""
+    category_spend: dict[str, int] = {}
+    monthly_totals = []
+    monthly_cashflow = []
+    total_spent_this_month = 0.0
+    total_income_this_month = 0.0
+    net_cashflow_this_month = 0.0
+
+    for month in sorted(rollup):
+        expenses = 0
+        income = 0
+        month_spend = 0
+        has_spending = False
+        for category, (_, spend_count, expense, category_income) in rollup[month].items():
+            expenses += expense
+            income += category_income
+            if spend_count:
+                has_spending = True
+                month_spend += expense
+                category_spend[category] = category_spend.get(category, 0) + expense
+
+        if has_spending:
+            total_spent_this_month = _to_amount(month_spend)
+            monthly_totals.append({"month": month, "amount": total_spent_this_month})
+
+        monthly_cashflow.append(
             {
-                "month": row["month"],
-                "expenses": round(float(row["expense_amount"]), 2),
-                "income": round(float(row["income_amount"]), 2),
-                "net": round(float(row["income_amount"] - row["expense_amount"]), 2),
+                "month": month,
+                "expenses": _to_amount(expenses),
+                "income": _to_amount(income),
+                "net": _to_amount(income - expenses),
             }
-            for _, row in cashflow_series.iterrows()
-        ]
+        )
+        total_income_this_month = _to_amount(income)
+        net_cashflow_this_month = _to_amount(income - expenses)
+
+    # Largest first; ties keep alphabetical order.
+    ranked = sorted(category_spend.items(), key=lambda item: (-item[1], item[0]))
+    category_totals = [{"category": category, "amount": _to_amount(amount)} for category, amount in ranked]
+
+    if category_totals:
+        biggest_category = {
+            "name": category_totals[0]["category"],
+            "amount": category_totals[0]["amount"],
+        }
+    else:
+        biggest_category = {"name": "N/A", "amount": 0}
 
     subscription_monthly_total = round(
         float(sum(item["monthly_cost"] for item in subscriptions)), 2
@@ -84,3 +181,7 @@ def build_summary(df: pd.DataFrame, subscriptions: list[dict]) -> dict:
         "monthly_totals": monthly_totals,
         "monthly_cashflow": monthly_cashflow,
     }
+
+
+def build_summary(df: pd.DataFrame, subscriptions: list[dict]) -> dict:
+    return summary_from_rollup(build_rollup(df), subscriptions)
@@ -0,0 +1,468 @@
+"""Column-wise transaction storage.
+
+A :class:`TransactionTable` keeps one array per transaction field instead of
+one dict per row. Text fields are dictionary-encoded: each row stores an
+integer code into the column's distinct values, so a merchant, category or
+date repeated across thousands of rows is held once. Tables convert to flat
+NumPy arrays for storage and back; text read from storage stays packed as
+UTF-8 until a column is needed whole, and reading one row decodes only that
+row's values.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from typing import Any, Callable, Collection, Iterable, Iterator, Mapping, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+TRANSACTION_COLUMNS = [
+    "tx_id",
+    "date",
+    "description",
+    "merchant",
+    "amount",
+    "category",
+    "source",
+    "interval_days",
+    "next_charge_date",
+]
+_FLOAT_COLUMNS = ("amount",)
+_INT_COLUMNS = ("interval_days",)
+# An edit inserting more than 1/_PATCH_MAX_FRACTION of the rows rebuilds the
+# row indexes instead of patching them.
+_PATCH_MAX_FRACTION = 32
+
+
+def _object_array(values: Sequence[Any]) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _pack_text(values: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Pack strings into one UTF-8 buffer and ``len(values) + 1`` byte offsets."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_text(data: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    raw = data.tobytes()
+    text = raw.decode("utf-8")
+    bounds = offsets.tolist()
+    if len(text) == len(raw):
+        # Pure ASCII: byte offsets are also character offsets.
+        values = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+    else:
+        values = [raw[start:end].decode("utf-8") for start, end in zip(bounds, bounds[1:])]
+    return _object_array(values)
+
+
+class _TextColumn:
+    """Dictionary-encoded text: row ``i`` holds ``values[codes[i]]``.
+
+    ``values`` is either decoded (an object array of str) or still packed as
+    UTF-8 ``(data, offsets)``. ``unique`` is false once concatenation may
+    have repeated a value; packing for storage merges the repeats.
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        values: np.ndarray | None = None,
+        packed: tuple[np.ndarray, np.ndarray] | None = None,
+        unique: bool = True,
+    ):
+        self.codes = codes
+        self._values = values
+        self._packed = packed
+        self.unique = unique
+
+    @classmethod
+    def from_strings(cls, strings: np.ndarray) -> _TextColumn:
+        codes, values = pd.factorize(strings)
+        return cls(codes.astype(np.int32), _object_array(values))
+
+    @property
+    def values(self) -> np.ndarray:
+        if self._values is None:
+            self._values = _unpack_text(*self._packed)
+        return self._values
+
+    def packed_values(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._packed is None:
+            self._packed = _pack_text(self._values)
+        return self._packed
+
+    def __len__(self) -> int:
+        """Number of distinct-value slots (not rows)."""
+        return len(self._values) if self._values is not None else len(self._packed[1]) - 1
+
+    def value(self, position: int) -> str:
+        code = int(self.codes[position])
+        if self._values is None:
+            data, offsets = self._packed
+            return data[offsets[code] : offsets[code + 1]].tobytes().decode("utf-8")
+        return self._values[code]
+
+    def decoded(self) -> np.ndarray:
+        return self.values[self.codes]
+
+    def ranks(self) -> np.ndarray:
+        """Per-row rank of each value in sorted order; equal values share a rank."""
+        _, inverse = np.unique(self.values.astype(str), return_inverse=True)
+        return inverse[self.codes]
+
+    def take(self, positions: np.ndarray) -> _TextColumn:
+        return _TextColumn(self.codes[positions], self._values, self._packed, self.unique)
+
+    def positions_in(self, wanted: Collection[str]) -> np.ndarray:
+        hits = np.flatnonzero(pd.Series(self.values, dtype=object).isin(list(wanted)).to_numpy())
+        return np.flatnonzero(np.isin(self.codes, hits))
+
+    def storage_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return ``(codes, data, offsets)`` with every value stored once."""
+        column = self if self.unique else _TextColumn.from_strings(self.decoded())
+        return (column.codes, *column.packed_values())
+
+    @staticmethod
+    def concat(columns: Sequence[_TextColumn]) -> _TextColumn:
+        if len(columns) == 1:
+            return columns[0]
+        shifts = np.cumsum([0, *map(len, columns)])
+        codes = np.concatenate([column.codes + shift for column, shift in zip(columns, shifts)]).astype(np.int32)
+        if all(column._values is not None for column in columns):
+            return _TextColumn(codes, np.concatenate([column._values for column in columns]), unique=False)
+        # Keep packed text packed: appending a few rows to a table read from
+        # storage shouldn't decode every value it already has.
+        data = np.concatenate([column.packed_values()[0] for column in columns])
+        bases = np.cumsum([0, *(len(column.packed_values()[0]) for column in columns)])
+        offsets = np.concatenate(
+            [[0], *(column.packed_values()[1][1:] + base for column, base in zip(columns, bases))]
+        ).astype(np.int64)
+        return _TextColumn(codes, packed=(data, offsets), unique=False)
+
+
+class TableEdit(NamedTuple):
+    """The arguments of the :meth:`TransactionTable.edit` call that made a table."""
+
+    base: TransactionTable
+    changes: TransactionTable
+    updates: list[int]
+    deletes: list[int]
+
+
+class TransactionTable(Sequence):
+    """Transactions held column by column; indexing returns row dicts.
+
+    ``date_index`` lists row positions ordered by ``(date, tx_id)`` and
+    ``category_index`` maps each category to its positions in that order;
+    ``tx_id_index`` lists them ordered by ``tx_id``. All are built on first
+    use, or read from storage, and patched by :meth:`edit`. Tables are never
+    modified in place.
+
+    A table returned by :meth:`edit` keeps the call in ``last_edit`` so the
+    store can log the change instead of rewriting every row.
+    """
+
+    def __init__(
+        self,
+        columns: Mapping[str, _TextColumn | np.ndarray],
+        date_index: np.ndarray | None = None,
+        category_index: dict[str, np.ndarray] | None = None,
+        tx_id_index: np.ndarray | None = None,
+    ):
+        self._columns = dict(columns)
+        self._date_index = date_index
+        self._category_index = category_index
+        self._tx_id_index = tx_id_index
+        self.last_edit: TableEdit | None = None
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> TransactionTable:
+        """Build a table from a frame that already has the coerced transaction columns."""
+        columns: dict[str, _TextColumn | np.ndarray] = {}
+        for name in TRANSACTION_COLUMNS:
+            if name in _FLOAT_COLUMNS:
+                columns[name] = frame[name].to_numpy(dtype=np.float64)
+            elif name in _INT_COLUMNS:
+                columns[name] = frame[name].to_numpy(dtype=np.int64)
+            else:
+                columns[name] = _TextColumn.from_strings(frame[name].to_numpy(dtype=object))
+        return cls(columns)
+
+    @classmethod
+    def from_records(cls, rows: Iterable[Mapping[str, Any]]) -> TransactionTable:
+        """Build a table from row dicts; missing text reads as "" and missing numbers as 0."""
+        frame = pd.DataFrame.from_records(list(rows), columns=TRANSACTION_COLUMNS)
+        for name in TRANSACTION_COLUMNS:
+            if name in _FLOAT_COLUMNS:
+                frame[name] = pd.to_numeric(frame[name], errors="coerce").fillna(0.0).astype(float)
+            elif name in _INT_COLUMNS:
+                frame[name] = pd.to_numeric(frame[name], errors="coerce").fillna(0).astype(int)
+            else:
+                frame[name] = frame[name].fillna("").astype(str)
+        return cls.from_frame(frame)
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> TransactionTable:
+        """Rebuild a table from :meth:`to_arrays` output without decoding any text."""
+        columns: dict[str, _TextColumn | np.ndarray] = {}
+        for name in TRANSACTION_COLUMNS:
+            if name in _FLOAT_COLUMNS or name in _INT_COLUMNS:
+                columns[name] = arrays[name]
+            else:
+                columns[name] = _TextColumn(
+                    arrays[f"{name}.codes"], packed=(arrays[f"{name}.data"], arrays[f"{name}.offsets"])
+                )
+
+        date_index = category_index = None
+        if "date_index" in arrays:
+            date_index = arrays["date_index"]
+            names = _unpack_text(arrays["category_index.data"], arrays["category_index.offsets"]).tolist()
+            bounds = arrays["category_index.bounds"].tolist()
+            positions = arrays["category_index.positions"]
+            category_index = {name: positions[bounds[slot] : bounds[slot + 1]] for slot, name in enumerate(names)}
+        return cls(columns, date_index, category_index, arrays.get("tx_id_index"))
+
+    def column_arrays(self) -> dict[str, np.ndarray]:
+        """Return the table's columns, without its row indexes, as flat arrays.
+
+        Each text column ``name`` becomes ``name.codes`` (one per row),
+        ``name.data`` and ``name.offsets`` (its values packed as UTF-8).
+        """
+        arrays: dict[str, np.ndarray] = {}
+        for name in TRANSACTION_COLUMNS:
+            column = self._columns[name]
+            if isinstance(column, _TextColumn):
+                arrays[f"{name}.codes"], arrays[f"{name}.data"], arrays[f"{name}.offsets"] = column.storage_arrays()
+            else:
+                arrays[name] = column
+        return arrays
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        """Return the table, and its row indexes, as flat arrays for storage."""
+        arrays = self.column_arrays()
+        category_index = self.category_index
+        arrays["date_index"] = np.asarray(self.date_index, dtype=np.int64)
+        arrays["category_index.data"], arrays["category_index.offsets"] = _pack_text(list(category_index))
+        arrays["category_index.bounds"] = np.cumsum(
+            [0, *(len(positions) for positions in category_index.values())], dtype=np.int64
+        )
+        arrays["category_index.positions"] = np.concatenate(
+            [np.zeros(0, dtype=np.int64), *(np.asarray(positions, dtype=np.int64) for positions in category_index.values())]
+        )
+        arrays["tx_id_index"] = np.asarray(self.tx_id_index, dtype=np.int64)
+        return arrays
+
+    @classmethod
+    def concat(cls, tables: Sequence[TransactionTable]) -> TransactionTable:
+        if not tables:
+            return cls.from_records([])
+        columns: dict[str, _TextColumn | np.ndarray] = {}
+        for name in TRANSACTION_COLUMNS:
+            parts = [table._columns[name] for table in tables]
+            columns[name] = _TextColumn.concat(parts) if isinstance(parts[0], _TextColumn) else np.concatenate(parts)
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return len(self._columns["amount"])
+
+    def __getitem__(self, position: int) -> dict[str, Any]:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("transaction position out of range")
+        return self.row(position)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter(self.to_records())
+
+    def row(self, position: int) -> dict[str, Any]:
+        return {name: self.cell(name, position) for name in TRANSACTION_COLUMNS}
+
+    def cell(self, name: str, position: int) -> Any:
+        column = self._columns[name]
+        if isinstance(column, _TextColumn):
+            return column.value(position)
+        return column[position].item()
+
+    def column(self, name: str) -> np.ndarray:
+        """Return one column whole; text columns as an object array of str."""
+        column = self._columns[name]
+        return column.decoded() if isinstance(column, _TextColumn) else column
+
+    def to_records(self) -> list[dict[str, Any]]:
+        values = [self.column(name).tolist() for name in TRANSACTION_COLUMNS]
+        return [dict(zip(TRANSACTION_COLUMNS, row)) for row in zip(*values)]
+
+    def to_frame(self, columns: Sequence[str] = TRANSACTION_COLUMNS) -> pd.DataFrame:
+        """Return ``columns`` as a DataFrame, decoding only those text columns."""
+        return pd.DataFrame({name: self.column(name) for name in columns}, columns=list(columns))
+
+    def take(self, positions: Sequence[int] | np.ndarray) -> TransactionTable:
+        positions = np.asarray(positions, dtype=np.int64)
+        return TransactionTable(
+            {
+                name: column.take(positions) if isinstance(column, _TextColumn) else column[positions]
+                for name, column in self._columns.items()
+            }
+        )
+
+    def positions_in(self, name: str, values: Collection[str]) -> np.ndarray:
+        """Return the positions of rows whose text column ``name`` is one of ``values``."""
+        return self._columns[name].positions_in(values)
+
+    def tx_id_positions(self, tx_ids: Iterable[str]) -> dict[str, list[int]]:
+        """Map each of ``tx_ids`` found in the table to its row positions.
+
+        Each id is found by bisecting ``tx_id_index``, decoding only the ids
+        the search compares against.
+        """
+        index = self.tx_id_index
+        column = self._columns["tx_id"]
+        found = {}
+        for tx_id in dict.fromkeys(tx_ids):
+            start = bisect_left(index, tx_id, key=column.value)
+            end = bisect_right(index, tx_id, lo=start, key=column.value)
+            if end > start:
+                found[tx_id] = sorted(index[start:end].tolist())
+        return found
+
+    @property
+    def tx_id_index(self) -> np.ndarray:
+        if self._tx_id_index is None:
+            self._tx_id_index = np.argsort(self._columns["tx_id"].ranks(), kind="stable").astype(np.int64)
+        return self._tx_id_index
+
+    @property
+    def date_index(self) -> np.ndarray:
+        if self._date_index is None:
+            self._build_indexes()
+        return self._date_index
+
+    @property
+    def category_index(self) -> dict[str, np.ndarray]:
+        if self._category_index is None:
+            self._build_indexes()
+        return self._category_index
+
+    def _build_indexes(self) -> None:
+        if not len(self):
+            self._date_index, self._category_index = np.zeros(0, dtype=np.int64), {}
+            return
+        order = np.lexsort((self._columns["tx_id"].ranks(), self._columns["date"].ranks()))
+        categories = self._columns["category"]
+        names, inverse = np.unique(categories.values.astype(str), return_inverse=True)
+        slots = inverse[categories.codes][order]
+        grouped = order[np.argsort(slots, kind="stable")]
+        bounds = np.cumsum(np.bincount(slots, minlength=len(names))).tolist()
+        category_index = {}
+        for name, start, end in zip(names.tolist(), [0, *bounds], bounds):
+            if end > start:
+                category_index[name] = grouped[start:end]
+        self._date_index, self._category_index = order, category_index
+
+    def edit(
+        self,
+        changes: TransactionTable,
+        updates: Sequence[int] = (),
+        deletes: Collection[int] = (),
+    ) -> TransactionTable:
+        """Return a copy with rows replaced, dropped and appended.
+
+        The first ``len(updates)`` rows of ``changes`` replace the rows at
+        positions ``updates``; the rest are appended. Rows at ``deletes``
+        (disjoint from ``updates``) are dropped and later rows move up.
+        Row indexes that were already built are patched, not rebuilt.
+        """
+        size = len(self)
+        updates = np.asarray(updates, dtype=np.int64)
+        deleted = np.unique(np.fromiter(deletes, dtype=np.int64))
+        order = np.arange(size, dtype=np.int64)
+        order[updates] = size + np.arange(len(updates))
+        order = np.concatenate([np.delete(order, deleted), np.arange(size + len(updates), size + len(changes))])
+        edited = TransactionTable.concat([self, changes]).take(order)
+
+        first_appended = size - len(deleted)
+        inserted = [*(updates - np.searchsorted(deleted, updates)).tolist(), *range(first_appended, len(edited))]
+        removed = np.concatenate([updates, deleted])
+        # Patching bisects O(log N) keys per new row; past a fraction of the
+        # table, sorting every row again is cheaper.
+        rebuild = len(inserted) * _PATCH_MAX_FRACTION > len(edited)
+        if self._date_index is not None:
+            if rebuild:
+                edited._build_indexes()
+            else:
+                edited._date_index, edited._category_index = _patch_indexes(
+                    self._date_index, self._category_index, edited, removed, deleted, inserted
+                )
+        if self._tx_id_index is not None and not rebuild:
+            edited._tx_id_index = _patch_tx_id_index(self._tx_id_index, edited, removed, deleted, inserted)
+        edited.last_edit = TableEdit(self, changes, updates.tolist(), deleted.tolist())
+        return edited
+
+
+def _remap_positions(positions: np.ndarray, removed: np.ndarray, deleted: np.ndarray) -> np.ndarray:
+    # Drop the positions of removed rows and shift the survivors past deleted rows.
+    kept = np.asarray(positions, dtype=np.int64)
+    kept = kept[~np.isin(kept, removed)]
+    return kept - np.searchsorted(deleted, kept)
+
+
+def _insert_sorted(index: np.ndarray, positions: Sequence[int], key: Callable[[int], Any]) -> np.ndarray:
+    """Insert ``positions`` into ``index``, which is ordered by ``key``, with one ``np.insert``.
+
+    Each new position goes after the rows with an equal key, and new rows
+    with equal keys keep their order, as if inserted one by one.
+    """
+    if not len(positions):
+        return index
+    positions = sorted(positions, key=key)
+    # Bisecting per new row decodes O(log N) keys each, not the whole column.
+    points = [bisect_right(index, key(position), key=key) for position in positions]
+    return np.insert(index, points, positions)
+
+
+def _patch_tx_id_index(
+    tx_id_index: np.ndarray,
+    table: TransactionTable,
+    removed: np.ndarray,
+    deleted: np.ndarray,
+    inserted: Iterable[int],
+) -> np.ndarray:
+    index = _remap_positions(tx_id_index, removed, deleted)
+    return _insert_sorted(index, list(inserted), table._columns["tx_id"].value)
+
+
+def _patch_indexes(
+    date_index: np.ndarray,
+    category_index: dict[str, np.ndarray],
+    table: TransactionTable,
+    removed: np.ndarray,
+    deleted: np.ndarray,
+    inserted: Iterable[int],
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    # Remap the surviving positions, then insert the new ones (already in
+    # the edited numbering).
+    def remap(positions: np.ndarray) -> np.ndarray:
+        return _remap_positions(positions, removed, deleted)
+
+    def sort_key(position: int) -> tuple[str, str]:
+        return table.cell("date", position), table.cell("tx_id", position)
+
+    inserted = list(inserted)
+    by_category: dict[str, list[int]] = {}
+    for position in inserted:
+        by_category.setdefault(table.cell("category", position), []).append(position)
+
+    next_date_index = _insert_sorted(remap(date_index), inserted, sort_key)
+    next_category_index = {category: remap(positions) for category, positions in category_index.items()}
+    for category, positions in by_category.items():
+        current = next_category_index.get(category, np.zeros(0, dtype=np.int64))
+        next_category_index[category] = _insert_sorted(current, positions, sort_key)
+    return next_date_index, {category: positions for category, positions in next_category_index.items() if len(positions)}
@@ -1,49 +1,781 @@
 """Persistent dataset store for MoneyMagic.
 
-Uses a JSON file on disk so data survives Flask worker restarts.
+Each dataset lives in its own ``<dataset_id>.npz`` file under ``STORE_DIR``
+so reads and writes only touch the dataset being served. Transactions are
+stored column by column (see :class:`TransactionTable`) together with their
+row indexes; the dataset's other fields are a small JSON document stored in
+the same file. Writes go to a temporary file that is atomically renamed
+over the old one, so readers never observe a half-written dataset.
+
+Edits to a dataset are not written to its snapshot. Each one is appended as
+a single JSON line to ``<dataset_id>.log``: the changed transaction rows,
+the positions they replace or delete, and any other field the edit set
+that is not derived from the transactions (goals). Readers replay the log
+over the snapshot through :func:`apply_transaction_changes`, which
+recomputes the summary, subscriptions and calendar, and once the log passes
+``LOG_MAX_RECORDS`` records or ``LOG_MAX_BYTES`` bytes a background thread
+folds it into a new snapshot. Every snapshot carries a random log id that
+its log records repeat; records written against an older snapshot, or torn
+by a crash mid-append, are skipped.
+
+Datasets written by earlier versions as ``<dataset_id>.json`` are converted
+the first time they are read.
+
+Reads memory-map the file instead of copying it: every column is a view of
+the mapped bytes, so a request only pages in the parts of the file it
+touches (the JSON fields for a summary, a few rows for a page of
+transactions) and worker processes share one copy through the OS page
+cache.
+
+Decoded datasets are kept in a small in-process LRU cache. Every cache hit
+is validated against the version of the files on disk (the snapshot's
+inode, mtime and size plus the log's size), so a write made by another
+worker process is picked up on the next read; records appended since are
+replayed onto the cached copy. Only an edit of the cached copy can be
+logged, so with the cache disabled every save rewrites the snapshot.
+Cached payloads are shared between callers and must be treated as
+read-only.
+
+Writers hold an exclusive ``flock`` on ``<dataset_id>.lock`` (a process-wide
+lock where ``fcntl`` is unavailable), so saves from several worker processes
+never interleave; readers take no lock. Every save bumps the dataset's
+revision number, and :func:`save_dataset` can refuse to overwrite a
+revision other than the one an edit was computed from, so concurrent
+read-modify-write cycles retry instead of losing updates.
 """
 
 from __future__ import annotations
 
 import json
+import logging
+import mmap
 import os
+import re
+import shutil
+import struct
+import tempfile
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
 from pathlib import Path
-from threading import Lock
-from typing import Any
+from threading import Lock, RLock, local
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, NamedTuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from services.dataset_service import DERIVED_FIELDS, apply_transaction_changes, has_incremental_state
+from services.table_service import TransactionTable
+
+logger = logging.getLogger(__name__)
 
+# Legacy single-file store; still read once to migrate existing datasets.
 STORE_PATH = Path(os.getenv("DATASTORE_PATH", Path(__file__).with_name("data").joinpath("datasets.json")))
-_LOCK = Lock()
+STORE_DIR = Path(os.getenv("DATASTORE_DIR", STORE_PATH.with_suffix("")))
+
+_DATASET_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+# Array in the dataset file holding the JSON-encoded non-transaction fields.
+_META_ARRAY = "meta"
+# Meta fields naming the log whose records apply on top of the snapshot,
+# the snapshot's revision (each record replayed adds one) and when that
+# revision was saved; log records carry their own save time in ``at``.
+_LOG_ID_FIELD = "_log_id"
+_REVISION_FIELD = "_revision"
+_SAVED_AT_FIELD = "_saved_at"
+_MIGRATION_MARKER = ".migrated"
+_LOCK = RLock()
+_migrated = False
+
+# Compaction thresholds for a dataset's log; 0 records disables the log.
+LOG_MAX_RECORDS = int(os.getenv("DATASTORE_LOG_MAX_RECORDS", "64"))
+LOG_MAX_BYTES = int(os.getenv("DATASTORE_LOG_MAX_BYTES", str(4 * 1024 * 1024)))
+_compactor: ThreadPoolExecutor | None = None
+_compacting: set[str] = set()
+_COMPACT_LOCK = Lock()
+# Dataset locks held by the current thread, so nested saves don't deadlock.
+_held_locks = local()
+
+CACHE_MAX_ENTRIES = int(os.getenv("DATASTORE_CACHE_SIZE", "64"))
+_Stamp = tuple[int, int, int]
+# Snapshot inode, latest mtime of snapshot and log, snapshot size, log size.
+_Version = tuple[int, int, int, int]
+# Revision and the time it was saved (ns since the epoch); unlike the
+# version, compaction leaves it unchanged.
+_RevisionStamp = tuple[int, int]
+
+
+class _Stored(NamedTuple):
+    """A decoded dataset and where it stands relative to its files."""
+
+    snapshot: _Stamp
+    version: _Version
+    payload: dict[str, Any]
+    log_id: str
+    # Bytes of the log replayed into ``payload`` and how many records they held.
+    log_offset: int
+    log_records: int
+    revision: int
+    saved_at: int
+
+
+class DatasetConflictError(Exception):
+    """Raised when a dataset was saved by someone else since it was read."""
 
+    def __init__(self, dataset_id: str, expected_revision: int, revision: int):
+        super().__init__(f"Dataset {dataset_id} is at revision {revision}, not {expected_revision}")
+        self.dataset_id = dataset_id
+        self.expected_revision = expected_revision
+        self.revision = revision
 
-def _load_all() -> dict[str, dict[str, Any]]:
-    if not STORE_PATH.exists():
-        return {}
 
+_CACHE: OrderedDict[str, _Stored] = OrderedDict()
+_CACHE_LOCK = Lock()
+_cache_hits = 0
+_cache_misses = 0
+
+
+def _dataset_path(dataset_id: str) -> Path | None:
+    if not _DATASET_ID_RE.match(dataset_id):
+        return None
+    return STORE_DIR / f"{dataset_id}.npz"
+
+
+def _log_path(path: Path) -> Path:
+    return path.with_suffix(".log")
+
+
+@contextmanager
+def _dataset_lock(path: Path) -> Iterator[None]:
+    """Hold the dataset's writer lock; reentrant within a thread."""
+    held: set[Path] = _held_locks.__dict__.setdefault("paths", set())
+    if path in held:
+        yield
+        return
+
+    if fcntl is None:
+        with _LOCK:
+            held.add(path)
+            try:
+                yield
+            finally:
+                held.discard(path)
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o644)
     try:
-        with STORE_PATH.open("r", encoding="utf-8") as handle:
+        # flock() locks belong to the open file, so this also excludes other
+        # threads of this process, each with their own descriptor.
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        held.add(path)
+        yield
+    finally:
+        held.discard(path)
+        os.close(fd)
+
+
+def _stamp(stat: os.stat_result) -> _Stamp:
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _stat_log(path: Path) -> os.stat_result | None:
+    try:
+        return _log_path(path).stat()
+    except OSError:
+        return None
+
+
+def _version(snapshot: _Stamp, log: os.stat_result | None) -> _Version:
+    if log is None:
+        return (*snapshot, 0)
+    return (snapshot[0], max(snapshot[1], log.st_mtime_ns), snapshot[2], log.st_size)
+
+
+def _read_json(path: Path) -> dict[str, Any] | None:
+    try:
+        with path.open("r", encoding="utf-8") as handle:
             data = json.load(handle)
     except (json.JSONDecodeError, OSError):
-        return {}
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+def _map_arrays(handle: BinaryIO) -> dict[str, np.ndarray] | None:
+    """Map the arrays of an ``.npz`` file without reading them.
+
+    ``np.savez`` stores members uncompressed, so each array's bytes sit
+    contiguously in the file right after its zip and ``.npy`` headers.
+    Returns None if a member is compressed or not a plain array.
+    """
+    with zipfile.ZipFile(handle) as archive:
+        members = archive.infolist()
+    if any(member.compress_type != zipfile.ZIP_STORED or not member.filename.endswith(".npy") for member in members):
+        return None
+    layout = []
+    for member in members:
+        # Local file header: 30 fixed bytes, then the name and extra field.
+        handle.seek(member.header_offset + 26)
+        name_length, extra_length = struct.unpack("<HH", handle.read(4))
+        handle.seek(name_length + extra_length, os.SEEK_CUR)
+        version = np.lib.format.read_magic(handle)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(handle)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(handle)
+        if dtype.hasobject:
+            return None
+        layout.append((member.filename[: -len(".npy")], shape, fortran_order, dtype, handle.tell()))
+
+    # Map only once every member is known to be mappable; the arrays keep the
+    # mapping alive and it closes when the last of them is dropped.
+    mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays: dict[str, np.ndarray] = {}
+    for name, shape, fortran_order, dtype, offset in layout:
+        array = np.frombuffer(mapped, dtype=dtype, count=int(np.prod(shape)), offset=offset)
+        arrays[name] = array.reshape(shape, order="F" if fortran_order else "C")
+    return arrays
+
+
+def _read_snapshot(path: Path) -> tuple[dict[str, Any], _Stamp, str, int, int] | None:
+    # Stamp the open handle so the stamp always describes the bytes we decoded,
+    # even if another process replaces the file mid-read.
+    try:
+        with path.open("rb") as handle:
+            stamp = _stamp(os.fstat(handle.fileno()))
+            arrays = _map_arrays(handle)
+            if arrays is None:
+                handle.seek(0)
+                with np.load(handle, allow_pickle=False) as stored:
+                    arrays = {name: stored[name] for name in stored.files}
+        meta = json.loads(arrays.pop(_META_ARRAY).tobytes())
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile, struct.error):
+        return None
+
+    log_id = str(meta.pop(_LOG_ID_FIELD, ""))
+    revision = int(meta.pop(_REVISION_FIELD, 0))
+    # Snapshots written before save times were kept fall back to the mtime.
+    saved_at = int(meta.pop(_SAVED_AT_FIELD, stamp[1]))
+    return {"transactions": TransactionTable.from_arrays(arrays), **meta}, stamp, log_id, revision, saved_at
+
+
+def _read_log(path: Path, log_id: str, offset: int) -> tuple[list[dict[str, Any]], int]:
+    """Return the log records for ``log_id`` after byte ``offset``, and where they end."""
+    try:
+        with _log_path(path).open("rb") as handle:
+            handle.seek(offset)
+            data = handle.read()
+    except FileNotFoundError:
+        return [], offset
+
+    # A line without its newline is still being written, or was torn by a
+    # crash; the next append starts a fresh line after it.
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and record.get("log") == log_id:
+            records.append(record)
+    return records, offset + end
+
 
-    if not isinstance(data, dict):
-        return {}
+def _replay(payload: dict[str, Any], records: list[dict[str, Any]]) -> dict[str, Any]:
+    # Appends always land at the end, so a run of append-only records folds
+    # into the record before it and the run costs one recompute, not one each.
+    edits: list[tuple[dict[int, dict], list[int], list[dict]]] = []
+    fields: dict[str, Any] = {}
+    for record in records:
+        rows, updates = record["rows"], record["updates"]
+        if updates or record["deletes"] or not edits:
+            edits.append((dict(zip(updates, rows)), record["deletes"], []))
+        edits[-1][2].extend(rows[len(updates):])
+        fields.update(record["fields"])
 
-    return {str(key): value for key, value in data.items() if isinstance(value, dict)}
+    for updates, deletes, appends in edits:
+        if updates or deletes or appends:
+            payload = apply_transaction_changes(payload, appends=appends, updates=updates, deletes=deletes)
+            payload["transactions"].last_edit = None
+    return {**payload, **fields}
 
 
-def _write_all(data: dict[str, dict[str, Any]]) -> None:
-    STORE_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with STORE_PATH.open("w", encoding="utf-8") as handle:
-        json.dump(data, handle)
+def _read_stored(path: Path) -> _Stored | None:
+    snapshot_read = _read_snapshot(path)
+    if snapshot_read is None:
+        return None
 
+    payload, snapshot, log_id, revision, saved_at = snapshot_read
+    log = _stat_log(path)
+    records, offset = _read_log(path, log_id, 0)
+    return _Stored(
+        snapshot,
+        _version(snapshot, log),
+        _replay(payload, records),
+        log_id,
+        offset,
+        len(records),
+        revision + len(records),
+        _saved_at(records, saved_at),
+    )
+
+
+def _saved_at(records: list[dict[str, Any]], default: int) -> int:
+    return int(records[-1].get("at", default)) if records else default
+
+
+def _log_record(current: _Stored, payload: dict[str, Any]) -> dict[str, Any] | None:
+    """Describe ``payload`` as an edit of ``current``, or None if it isn't one."""
+    base = current.payload
+    if payload.keys() != base.keys():
+        return None
+
+    transactions = payload["transactions"]
+    edit = getattr(transactions, "last_edit", None)
+    if transactions is base["transactions"]:
+        rows, updates, deletes = [], [], []
+        derived = ()
+    elif edit is not None and edit.base is base["transactions"] and has_incremental_state(base):
+        # Replay recomputes the derived fields, so only the rows are logged.
+        rows, updates, deletes = edit.changes.to_records(), edit.updates, edit.deletes
+        derived = DERIVED_FIELDS
+    else:
+        return None
+
+    fields = {
+        key: value
+        for key, value in payload.items()
+        if key != "transactions" and key not in derived and value is not base[key]
+    }
+    if any(key in DERIVED_FIELDS for key in fields):
+        return None
+    return {
+        "log": current.log_id,
+        "at": time.time_ns(),
+        "rows": rows,
+        "updates": updates,
+        "deletes": deletes,
+        "fields": fields,
+    }
+
+
+def _append_log(path: Path, current: _Stored, payload: dict[str, Any], record: dict[str, Any]) -> _Stored:
+    line = (json.dumps(record) + "\n").encode("utf-8")
+    fd = os.open(_log_path(path), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            line = b"\n" + line
+        os.write(fd, line)
+        os.fsync(fd)
+        log = os.fstat(fd)
+    finally:
+        os.close(fd)
+
+    payload["transactions"].last_edit = None
+    return current._replace(
+        version=_version(current.snapshot, log),
+        payload=dict(payload),
+        log_offset=log.st_size,
+        log_records=current.log_records + 1,
+        revision=current.revision + 1,
+        saved_at=record["at"],
+    )
+
+
+def _meta_array(rest: dict[str, Any], revision: int, saved_at: int) -> tuple[np.ndarray, str]:
+    log_id = uuid.uuid4().hex
+    meta = {**rest, _LOG_ID_FIELD: log_id, _REVISION_FIELD: revision, _SAVED_AT_FIELD: saved_at}
+    return np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8), log_id
+
+
+def _write_atomic(
+    path: Path, transactions: TransactionTable, rest: dict[str, Any], revision: int, saved_at: int
+) -> tuple[_Stamp, str]:
+    """Write a new snapshot, discarding the log; return its stamp and log id."""
+    arrays = transactions.to_arrays()
+    arrays[_META_ARRAY], log_id = _meta_array(rest, revision, saved_at)
+    return _replace_snapshot(path, lambda handle: np.savez(handle, **arrays)), log_id
+
+
+def _replace_snapshot(path: Path, write: Callable[[BinaryIO], None]) -> _Stamp:
+    """Atomically replace the snapshot with what ``write`` writes, discarding the log."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            write(handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+            # rename() keeps the inode, mtime and size, so this is the stamp
+            # readers will see once the file is in place.
+            stamp = _stamp(os.fstat(handle.fileno()))
+        os.replace(tmp_name, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(tmp_name)
+        raise
+
+    # Records left in the old log name the old log id, so readers skip them
+    # even if this process dies before the log is removed.
+    with suppress(FileNotFoundError):
+        _log_path(path).unlink()
+    return stamp
+
+
+class _ColumnSpool:
+    """Append tables' column arrays to one file per array, then write them as an ``.npz``.
+
+    Text columns keep each chunk's own dictionary: codes are shifted past
+    the values of earlier chunks, so a value shared by several chunks is
+    stored once per chunk until the table is next rewritten.
+    """
+
+    def __init__(self, directory: Path):
+        self._directory = directory
+        self._files: dict[str, BinaryIO] = {}
+        self._dtypes: dict[str, np.dtype] = {}
+        self._lengths: dict[str, int] = {}
+
+    def _append(self, name: str, array: np.ndarray) -> None:
+        if name not in self._files:
+            self._files[name] = (self._directory / name).open("w+b")
+            self._dtypes[name], self._lengths[name] = array.dtype, 0
+        self._files[name].write(np.ascontiguousarray(array, dtype=self._dtypes[name]).tobytes())
+        self._lengths[name] += len(array)
+
+    def add(self, table: TransactionTable) -> None:
+        arrays = table.column_arrays()
+        for name, array in arrays.items():
+            column, _, part = name.partition(".")
+            if not part:
+                self._append(name, array)
+            elif part == "codes":
+                offsets = f"{column}.offsets"
+                if offsets not in self._files:
+                    self._append(offsets, np.zeros(1, dtype=np.int64))
+                slots, size = self._lengths[offsets] - 1, self._lengths.get(f"{column}.data", 0)
+                self._append(name, array + slots)
+                self._append(f"{column}.data", arrays[f"{column}.data"])
+                self._append(offsets, arrays[offsets][1:] + size)
+
+    def write_npz(self, handle: BinaryIO, extra: dict[str, np.ndarray]) -> None:
+        """Write the spooled arrays and ``extra`` as ``np.savez`` would."""
+        with zipfile.ZipFile(handle, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name, spooled in self._files.items():
+                header = {
+                    "descr": np.lib.format.dtype_to_descr(self._dtypes[name]),
+                    "fortran_order": False,
+                    "shape": (self._lengths[name],),
+                }
+                with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                    np.lib.format.write_array_header_1_0(member, header)
+                    spooled.seek(0)
+                    shutil.copyfileobj(spooled, member, 1 << 20)
+            for name, array in extra.items():
+                with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                    np.lib.format.write_array(member, array, allow_pickle=False)
+
+    def close(self) -> None:
+        for spooled in self._files.values():
+            spooled.close()
+
+
+def _write_payload_atomic(path: Path, payload: dict[str, Any], revision: int, saved_at: int | None = None) -> _Stored:
+    """Write ``payload`` as a new snapshot; return it as it now reads back.
+
+    ``saved_at`` defaults to now; compaction passes the folded revision's.
+    """
+    saved_at = time.time_ns() if saved_at is None else saved_at
+    transactions = payload.get("transactions", [])
+    if not isinstance(transactions, TransactionTable):
+        transactions = TransactionTable.from_records(transactions)
+    transactions.last_edit = None
+    rest = {key: value for key, value in payload.items() if key != "transactions"}
+    snapshot, log_id = _write_atomic(path, transactions, rest, revision, saved_at)
+    payload = {"transactions": transactions, **rest}
+    return _Stored(snapshot, _version(snapshot, None), payload, log_id, 0, 0, revision, saved_at)
+
+
+def _migrate_json_dataset(path: Path) -> None:
+    """Convert a dataset saved as JSON by an earlier version."""
+    json_path = path.with_suffix(".json")
+    payload = _read_json(json_path)
+    if payload is None:
+        return
+    with _dataset_lock(path):
+        if not path.exists():
+            _write_payload_atomic(path, payload, 1)
+    for stale in (json_path, path.with_name(f"{path.stem}.rows.npz")):
+        with suppress(OSError):
+            stale.unlink()
+
+
+def _migrate_legacy_store() -> None:
+    """Split the legacy ``datasets.json`` into per-dataset files once."""
+    global _migrated
+    if _migrated:
+        return
 
-def save_dataset(dataset_id: str, payload: dict[str, Any]) -> None:
     with _LOCK:
-        data = _load_all()
-        data[dataset_id] = payload
-        _write_all(data)
+        if _migrated:
+            return
+
+        marker = STORE_DIR / _MIGRATION_MARKER
+        if STORE_PATH.exists() and not marker.exists():
+            legacy = _read_json(STORE_PATH) or {}
+            for dataset_id, payload in legacy.items():
+                path = _dataset_path(str(dataset_id))
+                if path is None or not isinstance(payload, dict) or path.with_suffix(".json").exists():
+                    continue
+                with _dataset_lock(path):
+                    if not path.exists():
+                        _write_payload_atomic(path, payload, 1)
+            STORE_DIR.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+
+        _migrated = True
+
+
+def _cache_put(dataset_id: str, stored: _Stored) -> None:
+    if CACHE_MAX_ENTRIES <= 0:
+        return
+    with _CACHE_LOCK:
+        _CACHE[dataset_id] = stored
+        _CACHE.move_to_end(dataset_id)
+        while len(_CACHE) > CACHE_MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+
+
+def _cache_get(dataset_id: str, version: _Version) -> _Stored | None:
+    """Return the cached entry, at any version; only one at ``version`` is a hit."""
+    global _cache_hits, _cache_misses
+    with _CACHE_LOCK:
+        entry = _CACHE.get(dataset_id)
+        if entry is not None:
+            _CACHE.move_to_end(dataset_id)
+        if entry is not None and entry.version == version:
+            _cache_hits += 1
+        else:
+            _cache_misses += 1
+        return entry
+
+
+def _cache_discard(dataset_id: str) -> None:
+    with _CACHE_LOCK:
+        _CACHE.pop(dataset_id, None)
+
+
+def cache_stats() -> dict[str, int]:
+    """Return hit/miss counters for the decoded-dataset cache."""
+    with _CACHE_LOCK:
+        return {
+            "hits": _cache_hits,
+            "misses": _cache_misses,
+            "entries": len(_CACHE),
+            "max_entries": CACHE_MAX_ENTRIES,
+        }
+
+
+def _load(dataset_id: str, path: Path) -> _Stored | None:
+    try:
+        snapshot = _stamp(path.stat())
+    except FileNotFoundError:
+        _migrate_json_dataset(path)
+        try:
+            snapshot = _stamp(path.stat())
+        except OSError:
+            _cache_discard(dataset_id)
+            return None
+    except OSError:
+        _cache_discard(dataset_id)
+        return None
+
+    log = _stat_log(path)
+    version = _version(snapshot, log)
+    stored = _cache_get(dataset_id, version)
+    if stored is not None and stored.version == version:
+        return stored
+
+    if stored is not None and stored.snapshot == snapshot and log is not None and log.st_size >= stored.log_offset:
+        # Same snapshot, longer log: replay only the new records.
+        records, offset = _read_log(path, stored.log_id, stored.log_offset)
+        stored = stored._replace(
+            version=version,
+            payload=_replay(stored.payload, records),
+            log_offset=offset,
+            log_records=stored.log_records + len(records),
+            revision=stored.revision + len(records),
+            saved_at=_saved_at(records, stored.saved_at),
+        )
+    else:
+        stored = _read_stored(path)
+        if stored is None:
+            _cache_discard(dataset_id)
+            return None
+        _cache_put(dataset_id, stored)
+        if stored.log_records:
+            # Every cold read would replay the log again; fold it into the
+            # snapshot so the next one only maps the file.
+            _schedule_compaction(dataset_id)
+        return stored
+
+    _cache_put(dataset_id, stored)
+    return stored
+
+
+def _schedule_compaction(dataset_id: str) -> None:
+    global _compactor
+    with _COMPACT_LOCK:
+        if dataset_id in _compacting:
+            return
+        _compacting.add(dataset_id)
+        if _compactor is None:
+            _compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-compaction")
+        _compactor.submit(_compact_in_background, dataset_id)
+
+
+def _compact_in_background(dataset_id: str) -> None:
+    try:
+        compact_dataset(dataset_id)
+    except Exception:
+        logger.warning("Could not compact the log of dataset %s", dataset_id, exc_info=True)
+    finally:
+        with _COMPACT_LOCK:
+            _compacting.discard(dataset_id)
+
+
+def compact_dataset(dataset_id: str) -> None:
+    """Fold the dataset's log into a new snapshot at the same revision and save time."""
+    path = _dataset_path(dataset_id)
+    if path is None:
+        raise ValueError(f"Invalid dataset id: {dataset_id!r}")
+
+    with _dataset_lock(path):
+        stored = _load(dataset_id, path)
+        if stored is None or not _log_path(path).exists():
+            return
+        _cache_put(dataset_id, _write_payload_atomic(path, stored.payload, stored.revision, stored.saved_at))
+
+
+def save_dataset(dataset_id: str, payload: dict[str, Any], expected_revision: int | None = None) -> int:
+    """Write ``payload`` as the dataset's new contents and return its new revision.
+
+    With ``expected_revision`` the save only happens if the dataset is
+    still at that revision (0 for a dataset that doesn't exist yet);
+    otherwise :class:`DatasetConflictError` is raised. When ``payload`` is
+    an edit of the current revision (the same transactions table, or one
+    made from it by :meth:`TransactionTable.edit`), only the changed rows
+    and fields are appended to the log; otherwise the snapshot is
+    rewritten.
+    """
+    path = _dataset_path(dataset_id)
+    if path is None:
+        raise ValueError(f"Invalid dataset id: {dataset_id!r}")
+
+    _migrate_legacy_store()
+    with _dataset_lock(path):
+        current = _load(dataset_id, path)
+        revision = current.revision if current is not None else 0
+        if expected_revision is not None and expected_revision != revision:
+            raise DatasetConflictError(dataset_id, expected_revision, revision)
+
+        record = _log_record(current, payload) if current is not None and LOG_MAX_RECORDS > 0 else None
+        if record is None:
+            stored = _write_payload_atomic(path, payload, revision + 1)
+        else:
+            stored = _append_log(path, current, payload, record)
+        _cache_put(dataset_id, stored)
+
+    if stored.log_records and (stored.log_records >= LOG_MAX_RECORDS or stored.log_offset >= LOG_MAX_BYTES):
+        _schedule_compaction(dataset_id)
+    return stored.revision
+
+
+def save_dataset_stream(
+    dataset_id: str,
+    transaction_chunks: Iterable[TransactionTable],
+    build_rest: Callable[[], dict[str, Any]],
+) -> None:
+    """Save a dataset whose transactions are produced chunk by chunk.
+
+    Each chunk's columns are appended to temporary files as it arrives, so
+    only one chunk is held in memory; once the last one has been produced
+    ``build_rest`` is called and returns the dataset's other top-level
+    fields, and the files are assembled into the snapshot. Row indexes need
+    every row, so they are left out and built when first used.
+    """
+    path = _dataset_path(dataset_id)
+    if path is None:
+        raise ValueError(f"Invalid dataset id: {dataset_id!r}")
+
+    _migrate_legacy_store()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=path.parent, prefix=f".{path.name}.") as directory:
+        spool = _ColumnSpool(Path(directory))
+        try:
+            spool.add(TransactionTable.from_records([]))
+            for chunk in transaction_chunks:
+                spool.add(chunk)
+            rest = build_rest()
+            with _dataset_lock(path):
+                current = _load(dataset_id, path)
+                revision = (current.revision if current is not None else 0) + 1
+                meta, _ = _meta_array(rest, revision, time.time_ns())
+                _replace_snapshot(path, lambda handle: spool.write_npz(handle, {_META_ARRAY: meta}))
+                _cache_discard(dataset_id)
+        finally:
+            spool.close()
+
+
+def _get_stored(dataset_id: str) -> _Stored | None:
+    path = _dataset_path(dataset_id)
+    if path is None:
+        return None
+
+    _migrate_legacy_store()
+    return _load(dataset_id, path)
+
+
+@contextmanager
+def dataset_write_lock(dataset_id: str) -> Iterator[None]:
+    """Keep other threads and processes from saving the dataset meanwhile.
+
+    A read-modify-write done while holding it cannot conflict; saves made
+    by the holder don't wait for it.
+    """
+    path = _dataset_path(dataset_id)
+    if path is None:
+        raise ValueError(f"Invalid dataset id: {dataset_id!r}")
+
+    with _dataset_lock(path):
+        yield
+
+
+def get_dataset_with_stamp(dataset_id: str) -> tuple[dict[str, Any], _RevisionStamp] | None:
+    """Return a dataset with its revision and when that revision was saved.
+
+    The stamp only changes when the dataset does; compacting its log or
+    rewriting its files leaves it alone.
+    """
+    stored = _get_stored(dataset_id)
+    return (stored.payload, (stored.revision, stored.saved_at)) if stored is not None else None
+
+
+def get_dataset_with_revision(dataset_id: str) -> tuple[dict[str, Any], int] | None:
+    """Return a dataset and its revision, to pass back to :func:`save_dataset`."""
+    stored = _get_stored(dataset_id)
+    return (stored.payload, stored.revision) if stored is not None else None
 
 
 def get_dataset(dataset_id: str) -> dict[str, Any] | None:
-    with _LOCK:
-        return _load_all().get(dataset_id)
+    stored = get_dataset_with_stamp(dataset_id)
+    return stored[0] if stored is not None else None
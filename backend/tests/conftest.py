@@ -0,0 +1,27 @@
+import pytest
+
+import store
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """Point the dataset store at an empty directory for one test."""
+    directory = tmp_path / "datasets"
+    monkeypatch.setenv("DATASTORE_DIR", str(directory))
+    monkeypatch.setenv("DATASTORE_PATH", str(tmp_path / "datasets.json"))
+    monkeypatch.setattr(store, "STORE_DIR", directory)
+    monkeypatch.setattr(store, "STORE_PATH", tmp_path / "datasets.json")
+    monkeypatch.setattr(store, "_migrated", False)
+    store._CACHE.clear()
+    yield directory
+    # Let a queued compaction finish while the store still points here.
+    if store._compactor is not None:
+        store._compactor.submit(lambda: None).result()
+    store._CACHE.clear()
+
+
+@pytest.fixture
+def client(store_dir):
+    from app import app
+
+    return app.test_client()
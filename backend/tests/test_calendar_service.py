@@ -0,0 +1,50 @@
+from datetime import date
+
+import pytest
+
+from services.calendar_service import build_calendar_plan, calendar_events
+
+TODAY = date(2026, 10, 17)
+
+SUBSCRIPTIONS = [
+    {"merchant": "NETFLIX.COM", "next_charge_date": "2025-05-06", "interval_days": 30, "monthly_cost": 15.49},
+    {"merchant": "Gym", "next_charge_date": "2026-09-01", "interval_days": 30, "monthly_cost": 30},
+    {"merchant": "Annual plan", "next_charge_date": "2026-12-01", "interval_days": 0, "monthly_cost": 5},
+]
+TRANSACTIONS = [
+    {"merchant": "Gym", "date": "2026-09-01", "amount": 30, "source": "manual_subscription", "interval_days": 30},
+    {"merchant": "Dentist", "date": "2026-11-20", "amount": 100, "source": "one_time_future_payment"},
+]
+
+
+def _first_by_title(events: list[dict]) -> dict[str, str]:
+    first: dict[str, str] = {}
+    for event in events:
+        first.setdefault(event["title"], event["date"])
+    return first
+
+
+@pytest.mark.parametrize("horizon", [2, 5, 12])
+def test_horizon_extends_the_single_occurrence_result(horizon):
+    plan = build_calendar_plan(SUBSCRIPTIONS, TRANSACTIONS)
+    single = calendar_events(plan, TODAY, 1)
+    several = calendar_events(plan, TODAY, horizon)
+
+    assert _first_by_title(several) == _first_by_title(single)
+    assert all(event in several for event in single)
+    assert all(event["date"] >= TODAY.isoformat() for event in several)
+    assert sum(event["title"] == "Pay Gym subscription" for event in several) == horizon
+    assert sum(event["title"] == "Pay Annual plan subscription" for event in several) == 1
+    assert _first_by_title(single) == {
+        "Pay Gym subscription": "2026-10-31",
+        "Pay NETFLIX.COM subscription": "2026-10-28",
+        "One-time payment: Dentist": "2026-11-20",
+        "Pay Annual plan subscription": "2026-12-01",
+    }
+
+
+def test_without_horizon_subscriptions_keep_their_stored_dates():
+    plan = build_calendar_plan(SUBSCRIPTIONS, TRANSACTIONS)
+    dates = {(event["title"], event["date"]) for event in calendar_events(plan, TODAY)}
+    assert ("Pay NETFLIX.COM subscription", "2025-05-06") in dates
+    assert ("Pay Gym subscription", "2026-09-01") in dates
@@ -0,0 +1,73 @@
+from services import coach_service
+from services.coach_service import CoachResponseCache, prompt_fingerprint
+
+
+class Clock:
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = CoachResponseCache(8, ttl_seconds=60, clock=clock)
+    cache.put("k", "answer")
+
+    clock.now += 59
+    assert cache.get("k") == "answer"
+    clock.now += 1
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = CoachResponseCache(2, ttl_seconds=60, clock=Clock())
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+
+
+def test_zero_ttl_disables_caching():
+    cache = CoachResponseCache(8, ttl_seconds=0, clock=Clock())
+    cache.put("k", "answer")
+    assert cache.get("k") is None
+
+
+def test_key_depends_on_model_and_prompt(monkeypatch):
+    key = prompt_fingerprint("How do I save?")
+    assert prompt_fingerprint("How do I save?") == key
+    assert prompt_fingerprint("How do I save? ") != key
+
+    monkeypatch.setattr(coach_service, "GEMINI_MODEL", "another-model")
+    assert prompt_fingerprint("How do I save?") != key
+
+
+def test_disk_tier_is_shared_and_expires(tmp_path):
+    clock = Clock()
+    writer = CoachResponseCache(8, ttl_seconds=60, directory=tmp_path, clock=clock)
+    writer.put("k", "answer")
+    assert (tmp_path / "k.json").exists()
+
+    # Another worker, with its memory tier off, reads the shared entry.
+    reader = CoachResponseCache(0, ttl_seconds=60, directory=tmp_path, clock=clock)
+    assert reader.get("k") == "answer"
+    assert reader.stats()["entries"] == 0
+
+    fresh = CoachResponseCache(8, ttl_seconds=60, directory=tmp_path, clock=clock)
+    clock.now += 60
+    assert fresh.get("k") is None
+    assert not (tmp_path / "k.json").exists()
+
+
+def test_unreadable_disk_entries_are_misses(tmp_path):
+    (tmp_path / "k.json").write_text("{not json", encoding="utf-8")
+    cache = CoachResponseCache(8, ttl_seconds=60, directory=tmp_path, clock=Clock())
+    assert cache.get("k") is None
+    assert cache.misses == 1
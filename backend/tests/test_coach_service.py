@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import BoundedSemaphore
+
+import pytest
+
+from services import coach_service
+
+pytest.importorskip("google.genai")
+
+SUMMARY = {
+    "total_spent_this_month": 420.0,
+    "biggest_category": {"name": "Food", "amount": 200.0},
+    "subscription_monthly_total": 15.49,
+    "category_totals": [{"category": "Food", "amount": 200.0}],
+}
+
+
+class StubModel:
+    """A local stand-in for the Gemini REST API; answers once ``gate`` is set."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.requests: list[dict] = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def handle(self, handler: BaseHTTPRequestHandler) -> None:
+        body = json.loads(handler.rfile.read(int(handler.headers["Content-Length"])))
+        with self._lock:
+            self.requests.append({"path": handler.path, "api_key": handler.headers.get("x-goog-api-key")})
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            self.gate.wait(10)
+            prompt = body["contents"][0]["parts"][0]["text"]
+            question = prompt.rsplit("User question:", 1)[1].strip()
+            answer = {"candidates": [{"content": {"role": "model", "parts": [{"text": f"Stub answer: {question}"}]}}]}
+            payload = json.dumps(answer).encode("utf-8")
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    model = StubModel()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            model.handle(self)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    clients = []
+    make_client = coach_service._make_genai_client
+
+    def counting_make_client(api_key):
+        clients.append(api_key)
+        return make_client(api_key)
+
+    monkeypatch.setattr(coach_service, "GEMINI_BASE_URL", f"http://127.0.0.1:{server.server_port}/")
+    monkeypatch.setattr(coach_service, "_make_genai_client", counting_make_client)
+    monkeypatch.setattr(coach_service, "_client", None)
+    monkeypatch.setattr(coach_service, "_RESPONSE_CACHE", coach_service.CoachResponseCache(64, 60))
+    monkeypatch.setattr(coach_service, "COACH_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(coach_service, "_call_slots", BoundedSemaphore(2))
+    monkeypatch.setattr(coach_service, "_executor", None)
+    monkeypatch.setattr(coach_service, "COACH_WAIT_SECONDS", 5.0)
+    model.clients = clients
+    yield model
+
+    model.gate.set()
+    if coach_service._executor is not None:
+        coach_service._executor.shutdown(wait=True)
+    server.shutdown()
+    server.server_close()
+
+
+def _ask(question: str) -> dict:
+    return coach_service.build_coach_response(question, SUMMARY, [], gemini_api_key="test-key")
+
+
+def test_answers_come_through_one_shared_client(stub):
+    for question in ("Where can I save?", "What should I cut?", "Where can I save?"):
+        response = _ask(question)
+        assert response["response_source"] == "gemini"
+        assert response["summary_text"] == f"Stub answer: {question}"
+
+    # The repeated question is served from the cache.
+    assert len(stub.requests) == 2
+    assert all(request["path"].endswith(f"/models/{coach_service.GEMINI_MODEL}:generateContent") for request in stub.requests)
+    assert {request["api_key"] for request in stub.requests} == {"test-key"}
+    assert stub.clients == ["test-key"]
+
+
+def test_concurrent_calls_are_capped_by_the_pool(stub, monkeypatch):
+    monkeypatch.setattr(coach_service, "COACH_WAIT_SECONDS", 0.5)
+    stub.gate.clear()
+    responses = []
+    threads = [threading.Thread(target=lambda n=n: responses.append(_ask(f"question {n}"))) for n in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [response["response_source"] for response in responses] == ["rules"] * 5
+    assert stub.peak == 2
+    assert len(stub.requests) == 2
+
+
+def test_slow_answers_fall_back_to_rules_and_are_cached_when_they_arrive(stub, monkeypatch):
+    monkeypatch.setattr(coach_service, "COACH_WAIT_SECONDS", 0.2)
+    stub.gate.clear()
+
+    started = time.perf_counter()
+    response = _ask("Where can I save?")
+    assert time.perf_counter() - started < 2
+    assert response == coach_service._rules_response("Where can I save?", SUMMARY, [])
+
+    stub.gate.set()
+    deadline = time.monotonic() + 5
+    while coach_service.coach_cache_stats()["entries"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    response = _ask("Where can I save?")
+    assert response["response_source"] == "gemini"
+    assert response["summary_text"] == "Stub answer: Where can I save?"
+    assert len(stub.requests) == 1
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+import store
+from services import coach_service
+from services.dataset_service import rebuild_dataset
+
+ROWS = [
+    {"date": f"2024-0{month}-05", "description": "NETFLIX.COM", "merchant": "NETFLIX.COM", "amount": -15.49}
+    for month in range(1, 5)
+]
+
+
+@pytest.fixture
+def coach_client(client, monkeypatch):
+    store.save_dataset("ds", rebuild_dataset(ROWS))
+    monkeypatch.setattr(coach_service, "load_gemini_key", lambda: "test-key")
+    monkeypatch.setattr(coach_service, "_RESPONSE_CACHE", coach_service.CoachResponseCache(8, 60))
+    return client
+
+
+def _events(response) -> list[tuple[str, dict]]:
+    body = response.get_data(as_text=True)
+    assert body.endswith("\n\n")
+    events = []
+    for block in body[:-2].split("\n\n"):
+        event_line, data_line = block.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def _ask(client):
+    return client.post("/api/datasets/ds/coach/stream", json={"question": "Where can I save?"})
+
+
+def test_stream_sends_fallback_then_deltas_then_done(coach_client, monkeypatch):
+    monkeypatch.setattr(coach_service, "_stream_gemini", lambda prompt, api_key: iter(["Cancel ", "Netflix."]))
+    response = _ask(coach_client)
+
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert response.headers["X-Accel-Buffering"] == "no"
+    events = _events(response)
+    assert [event for event, _ in events] == ["fallback", "delta", "delta", "done"]
+    fallback = events[0][1]
+    assert fallback["dataset_id"] == "ds" and fallback["response_source"] == "rules"
+    assert [data for event, data in events if event == "delta"] == [{"text": "Cancel "}, {"text": "Netflix."}]
+    assert events[-1][1] == {
+        "dataset_id": "ds",
+        "summary_text": "Cancel Netflix.",
+        "recommendations": [],
+        "response_source": "gemini",
+    }
+
+
+def test_stream_failing_midway_ends_with_the_fallback(coach_client, monkeypatch):
+    def failing_stream(prompt, api_key):
+        yield "Cancel "
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(coach_service, "_stream_gemini", failing_stream)
+    events = _events(_ask(coach_client))
+
+    assert [event for event, _ in events] == ["fallback", "delta", "done"]
+    assert events[-1][1] == events[0][1]
+    assert coach_service.coach_cache_stats()["entries"] == 0
+
+
+def test_stream_without_a_model_key_sends_only_the_fallback(coach_client, monkeypatch):
+    monkeypatch.setattr(coach_service, "load_gemini_key", lambda: None)
+    events = _events(_ask(coach_client))
+
+    assert [event for event, _ in events] == ["fallback", "done"]
+    assert events[1][1] == events[0][1]
@@ -0,0 +1,35 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from services import csv_service
+from services.csv_service import iter_normalized_csv, parse_and_normalize_csv
+
+CSV = (
+    b"Date,Merchant,Description,Amount\n"
+    b"2024-01-02,NETFLIX.COM,Streaming,15.99\n"
+    b"2024-01-03,,Cash withdrawal,40\n"
+    b"2024-01-04,Corner Cafe,,4.5\n"
+    b"2024-01-05,  Whole Foods  , Groceries ,82.1\n"
+    b"2024-01-06,,,12\n"
+)
+
+
+def _stream(chunksize: int) -> pd.DataFrame:
+    return pd.concat(list(iter_normalized_csv(BytesIO(CSV), chunksize=chunksize)), ignore_index=True)
+
+
+@pytest.mark.filterwarnings("error::FutureWarning")
+def test_engines_and_stream_agree_on_empty_text_cells(monkeypatch):
+    frames = {"stream": _stream(2)}
+    if csv_service.pyarrow is not None:
+        frames["pyarrow"] = parse_and_normalize_csv(CSV).reset_index(drop=True)
+    monkeypatch.setattr(csv_service, "pyarrow", None)
+    frames["c"] = parse_and_normalize_csv(CSV).reset_index(drop=True)
+
+    expected = frames.pop("c")
+    assert expected["merchant"].tolist() == ["NETFLIX.COM", "nan", "Corner Cafe", "Whole Foods", "nan"]
+    assert expected["description"].tolist() == ["Streaming", "Cash withdrawal", "nan", "Groceries", "nan"]
+    for name, frame in frames.items():
+        pd.testing.assert_frame_equal(frame, expected, obj=name)
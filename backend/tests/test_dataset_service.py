@@ -0,0 +1,164 @@
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from services.dataset_service import apply_transaction_changes, rebuild_dataset, summarize_range
+from services.summary_service import build_summary
+
+ROWS = [
+    *({"date": f"2024-0{month}-05", "merchant": "NETFLIX.COM", "description": "NETFLIX.COM", "amount": 15.49} for month in range(1, 5)),
+    *({"date": f"2024-0{month}-12", "merchant": "Spotify", "description": "Spotify", "amount": 9.99} for month in range(1, 5)),
+    {"date": "2024-01-20", "merchant": "Whole Foods", "description": "Groceries", "amount": 82.10},
+    {"date": "2024-02-01", "merchant": "Payroll", "description": "Salary", "amount": -2500.0},
+    {"date": "2024-03-15", "merchant": "Uber", "description": "Ride", "amount": 18.25},
+    {"date": "2024-04-01", "merchant": "Gym", "description": "Gym", "amount": 30.0, "source": "manual_subscription", "interval_days": 30},
+    {"date": "2024-06-20", "merchant": "Dentist", "description": "Checkup", "amount": 100.0, "source": "one_time_future_payment"},
+]
+
+COMPARED_FIELDS = ("subscriptions", "summary", "rollup", "subscription_index", "calendar")
+
+
+def _assert_matches_rebuild(dataset: dict) -> None:
+    rebuilt = rebuild_dataset(dataset["transactions"].to_records(), dataset["goals"])
+    assert dataset["transactions"].to_records() == rebuilt["transactions"].to_records()
+    for field in COMPARED_FIELDS:
+        assert dataset[field] == rebuilt[field], field
+
+
+def _position(dataset: dict, merchant: str, date: str) -> int:
+    for position, row in enumerate(dataset["transactions"]):
+        if row["merchant"] == merchant and row["date"] == date:
+            return position
+    raise AssertionError(f"no {merchant} row on {date}")
+
+
+@pytest.fixture
+def dataset():
+    return rebuild_dataset(ROWS, {"monthly_savings": 200})
+
+
+def test_add_matches_rebuild(dataset):
+    edited = apply_transaction_changes(
+        dataset,
+        appends=[
+            {"date": "2024-05-05", "merchant": "NETFLIX.COM", "description": "NETFLIX.COM", "amount": 15.49},
+            {"date": "2024-05-09", "merchant": "Target", "description": "Household", "amount": 41.0},
+        ],
+    )
+    _assert_matches_rebuild(edited)
+    assert len(edited["transactions"]) == len(ROWS) + 2
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"amount": 19.99},
+        {"category": "Entertainment"},
+        {"date": "2024-02-27"},
+        {"merchant": "Hulu", "description": "Hulu"},
+    ],
+)
+def test_update_matches_rebuild(dataset, change):
+    position = _position(dataset, "NETFLIX.COM", "2024-02-05")
+    row = dataset["transactions"][position]
+    _assert_matches_rebuild(apply_transaction_changes(dataset, updates={position: {**row, **change}}))
+
+
+def test_delete_matches_rebuild(dataset):
+    deletes = [_position(dataset, "Spotify", "2024-03-12"), _position(dataset, "Whole Foods", "2024-01-20")]
+    edited = apply_transaction_changes(dataset, deletes=deletes)
+    _assert_matches_rebuild(edited)
+    assert len(edited["transactions"]) == len(ROWS) - 2
+
+
+def test_manual_subscription_rows_match_rebuild(dataset):
+    gym = _position(dataset, "Gym", "2024-04-01")
+    dentist = _position(dataset, "Dentist", "2024-06-20")
+    edited = apply_transaction_changes(
+        dataset,
+        appends=[{"date": "2024-04-10", "merchant": "Cloud", "description": "Storage", "amount": 2.99, "category": "Subscription"}],
+        updates={gym: {**dataset["transactions"][gym], "interval_days": 7}},
+        deletes=[dentist],
+    )
+    _assert_matches_rebuild(edited)
+    assert {item["merchant"] for item in edited["subscriptions"]} >= {"Gym", "Cloud"}
+
+    # Turning a manual subscription back into an ordinary row drops it.
+    gym = _position(edited, "Gym", "2024-04-01")
+    edited = apply_transaction_changes(edited, updates={gym: {**edited["transactions"][gym], "source": ""}})
+    _assert_matches_rebuild(edited)
+    assert "Gym" not in {item["merchant"] for item in edited["subscriptions"]}
+
+
+@pytest.mark.parametrize("missing", ["rollup", "subscription_index"])
+def test_dataset_without_incremental_state_is_rebuilt(dataset, missing):
+    legacy = {key: value for key, value in dataset.items() if key != missing}
+    position = _position(dataset, "Uber", "2024-03-15")
+    edited = apply_transaction_changes(
+        legacy,
+        appends=[{"date": "2024-05-01", "merchant": "Lyft", "description": "Ride", "amount": 12.0}],
+        updates={position: {**dataset["transactions"][position], "amount": 25.0}},
+        deletes=[_position(dataset, "Payroll", "2024-02-01")],
+    )
+    _assert_matches_rebuild(edited)
+    assert edited["rollup"] is not None and edited["subscription_index"]["detected_count"] is not None
+    assert edited["goals"] == {"monthly_savings": 200}
+
+
+@pytest.fixture(scope="module")
+def ranged_dataset() -> dict:
+    rng = random.Random(11)
+    merchants = ["UBER", "NETFLIX.COM", "KROGER", "AMAZON", "Payroll"]
+    first = date(2023, 11, 1)
+    rows = [
+        {
+            "date": (first + timedelta(days=rng.randrange(500))).isoformat(),
+            "merchant": merchant,
+            "description": merchant,
+            "amount": round(rng.uniform(5, 120), 2) if merchant != "Payroll" else -1800.0,
+        }
+        for merchant in (rng.choice(merchants) for _ in range(1500))
+    ]
+    dataset = rebuild_dataset(rows)
+    # Indexes patched by edits must bisect the same way as freshly built ones.
+    dataset = apply_transaction_changes(
+        dataset,
+        appends=[{"date": "2024-02-29", "merchant": "UBER", "description": "UBER", "amount": 14.0}],
+        updates={3: {**dataset["transactions"][3], "date": "2024-03-01", "category": "Food"}},
+        deletes=[10, 20, 30],
+    )
+    return dataset
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (None, None),
+        ("2024-01-01", "2024-03-31"),
+        ("2024-01-15", "2024-03-31"),
+        ("2024-01-01", "2024-03-10"),
+        ("2024-01-15", "2024-03-10"),
+        ("2024-02-10", "2024-02-20"),
+        ("2024-02-01", "2024-02-29"),
+        ("2024-02-29", "2024-03-01"),
+        ("2024-06-07", None),
+        (None, "2024-06-07"),
+        ("2025-06-01", "2025-12-31"),
+    ],
+)
+@pytest.mark.parametrize("categories", [None, ["Transport"], ["Food", "Shopping"], ["Nope"]])
+def test_summarize_range_matches_build_summary_on_filtered_rows(ranged_dataset, start, end, categories):
+    dataset = ranged_dataset
+    rows = pd.DataFrame(dataset["transactions"].to_records())
+    selected = rows
+    if start:
+        selected = selected[selected["date"] >= start]
+    if end:
+        selected = selected[selected["date"] <= end]
+    if categories is not None:
+        selected = selected[selected["category"].isin(categories)]
+
+    expected = build_summary(selected, dataset["subscriptions"])
+    assert summarize_range(dataset, start, end, categories) == expected
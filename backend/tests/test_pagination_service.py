@@ -0,0 +1,104 @@
+import base64
+import json
+import random
+
+import pytest
+
+import store
+from services.dataset_service import rebuild_dataset
+
+MERCHANTS = ["UBER", "NETFLIX.COM", "KROGER", "AMAZON", "Corner Cafe"]
+
+
+def _rows() -> list[dict]:
+    rng = random.Random(5)
+    # Few distinct dates, so pages often split a run of same-day rows.
+    return [
+        {
+            "tx_id": f"t{rng.randrange(10**6):06d}-{number}",
+            "date": f"2024-03-{rng.randint(1, 20):02d}",
+            "merchant": merchant,
+            "description": f"{merchant} order",
+            "amount": round(rng.uniform(1, 90), 2),
+        }
+        for number, merchant in enumerate(rng.choice(MERCHANTS) for _ in range(600))
+    ]
+
+
+@pytest.fixture
+def seeded(client):
+    dataset = rebuild_dataset(_rows())
+    store.save_dataset("ds", dataset)
+    return client, dataset["transactions"].to_records()
+
+
+def _walk(client, **params) -> list[dict]:
+    rows, cursor = [], None
+    while True:
+        query = {**params, "limit": 37, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/datasets/ds/transactions", query_string=query)
+        assert response.status_code == 200
+        body = response.get_json()
+        assert len(body["transactions"]) <= 37
+        rows.extend(body["transactions"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+def _expected(records: list[dict], descending: bool = False, **filters) -> list[dict]:
+    selected = [
+        row
+        for row in records
+        if row["date"] >= filters.get("start", "")
+        and row["date"] <= filters.get("end", "9999")
+        and ("category" not in filters or row["category"] in filters["category"])
+        and filters.get("q", "").lower() in f"{row['merchant']} {row['description']}".lower()
+    ]
+    return sorted(selected, key=lambda row: (row["date"], row["tx_id"]), reverse=descending)
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"start": "2024-03-04", "end": "2024-03-11"},
+        {"category": ["Transport"]},
+        {"category": ["Transport", "Entertainment", "Groceries"]},
+        {"category": ["Groceries", "Missing"], "start": "2024-03-05"},
+        {"q": "cafe"},
+    ],
+)
+def test_walking_pages_yields_every_row_once_in_order(seeded, order, filters):
+    client, records = seeded
+    rows = _walk(client, order=order, **filters)
+    expected = _expected(records, descending=order == "desc", **filters)
+
+    assert expected
+    assert [row["tx_id"] for row in rows] == [row["tx_id"] for row in expected]
+    assert rows == expected
+
+
+def test_walking_pages_with_fields_projects_rows(seeded):
+    client, records = seeded
+    rows = _walk(client, fields="date,amount")
+    assert rows == [{"date": row["date"], "amount": row["amount"]} for row in _expected(records)]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor!",
+        "é",
+        base64.urlsafe_b64encode(b"{not json").decode(),
+        base64.urlsafe_b64encode(json.dumps({"date": "2024-03-01"}).encode()).decode(),
+        base64.urlsafe_b64encode(json.dumps(["2024-03-01"]).encode()).decode(),
+        base64.urlsafe_b64encode(json.dumps(["2024-03-01", 7]).encode()).decode(),
+    ],
+)
+def test_invalid_cursor_is_rejected(seeded, cursor):
+    client, _ = seeded
+    response = client.get("/api/datasets/ds/transactions", query_string={"limit": 10, "cursor": cursor})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Malformed cursor."}
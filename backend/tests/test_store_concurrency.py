@@ -0,0 +1,54 @@
+import pytest
+
+import app as app_module
+import store
+from benchmarks import stress_store
+from services.dataset_service import apply_transaction_changes, rebuild_dataset
+
+ROW = {"date": "2024-05-01", "description": "Lunch", "merchant": "Corner Cafe", "amount": 12.5}
+
+
+def test_save_with_a_stale_revision_raises_conflict(store_dir):
+    first = store.save_dataset("ds", rebuild_dataset([{**ROW, "tx_id": "a"}]), expected_revision=0)
+    dataset, revision = store.get_dataset_with_revision("ds")
+    assert revision == first == 1
+
+    store.save_dataset("ds", apply_transaction_changes(dataset, appends=[{**ROW, "tx_id": "b"}]))
+    with pytest.raises(store.DatasetConflictError) as raised:
+        store.save_dataset("ds", apply_transaction_changes(dataset, appends=[{**ROW, "tx_id": "c"}]), expected_revision=1)
+    assert (raised.value.expected_revision, raised.value.revision) == (1, 2)
+    with pytest.raises(store.DatasetConflictError):
+        store.save_dataset("ds", rebuild_dataset([]), expected_revision=0)
+    assert store.get_dataset("ds")["transactions"].column("tx_id").tolist() == ["a", "b"]
+
+
+def test_save_edit_retries_after_a_concurrent_save(store_dir):
+    store.save_dataset("ds", rebuild_dataset([{**ROW, "tx_id": "a"}]))
+    calls = []
+
+    def edit(dataset: dict) -> dict:
+        calls.append(len(dataset["transactions"]))
+        if len(calls) == 1:
+            # Another worker saves between this edit's read and its save.
+            current = store.get_dataset("ds")
+            store.save_dataset("ds", apply_transaction_changes(current, appends=[{**ROW, "tx_id": "other"}]))
+        return apply_transaction_changes(dataset, appends=[{**ROW, "tx_id": "mine"}])
+
+    updated = app_module._save_edit("ds", edit)
+
+    assert calls == [1, 2]
+    assert updated["transactions"].column("tx_id").tolist() == ["a", "other", "mine"]
+    dataset, revision = store.get_dataset_with_revision("ds")
+    assert revision == 3
+    assert dataset["transactions"].column("tx_id").tolist() == ["a", "other", "mine"]
+
+
+def test_edits_from_several_processes_are_never_lost(store_dir, monkeypatch):
+    # Compact often so log rewrites race with appends too.
+    monkeypatch.setenv("DATASTORE_LOG_MAX_RECORDS", "8")
+    outcome = stress_store.run("stress", processes=3, edits=12)
+
+    assert outcome["failed"] == 0
+    assert outcome["lost"] == []
+    assert sorted(outcome["stored_ids"]) == sorted(outcome["added"])
+    assert outcome["revision"] == 1 + outcome["edits_done"]
@@ -0,0 +1,164 @@
+import store
+from services.dataset_service import apply_transaction_changes, find_transaction_positions, rebuild_dataset
+
+
+def _rows() -> list[dict]:
+    rows = []
+    for month in range(1, 7):
+        rows.append({"tx_id": f"n{month}", "date": f"2024-0{month}-05", "description": "NETFLIX.COM", "merchant": "NETFLIX.COM", "amount": -15.49})
+        rows.append({"tx_id": f"c{month}", "date": f"2024-0{month}-11", "description": "Coffee", "merchant": "Corner Cafe", "amount": -4.5})
+    rows.append({"tx_id": "g1", "date": "2024-06-01", "description": "Gym", "merchant": "Gym", "amount": 30, "source": "manual_subscription", "interval_days": 30})
+    return rows
+
+
+def _edit(dataset_id: str, **changes) -> None:
+    store.save_dataset(dataset_id, apply_transaction_changes(store.get_dataset(dataset_id), **changes))
+
+
+def _position(dataset_id: str, tx_id: str) -> int:
+    return find_transaction_positions(store.get_dataset(dataset_id), tx_id)[0]
+
+
+def _make_edits(dataset_id: str) -> None:
+    _edit(dataset_id, appends=[{"tx_id": "n7", "date": "2024-07-05", "description": "NETFLIX.COM", "merchant": "NETFLIX.COM", "amount": -15.49}])
+    _edit(dataset_id, updates={_position(dataset_id, "c3"): {**store.get_dataset(dataset_id)["transactions"][_position(dataset_id, "c3")], "date": "2024-08-30", "category": "Dining"}})
+    _edit(dataset_id, deletes=[_position(dataset_id, "n2")])
+    _edit(dataset_id, appends=[{"tx_id": "s1", "date": "2024-07-02", "description": "Spotify", "merchant": "Spotify", "amount": 9.99, "source": "manual_subscription", "interval_days": 30}])
+    dataset = store.get_dataset(dataset_id)
+    store.save_dataset(dataset_id, {**dataset, "goals": {"monthly_budget": 900.0}})
+
+
+def _assert_matches_rebuild(dataset: dict) -> None:
+    expected = rebuild_dataset(dataset["transactions"].to_records(), dataset["goals"])
+    assert dataset["transactions"].to_records() == expected["transactions"].to_records()
+    for key in expected:
+        if key != "transactions":
+            assert dataset[key] == expected[key], key
+
+
+def test_replaying_the_log_matches_a_rebuild(store_dir):
+    store.save_dataset("ds", rebuild_dataset(_rows()))
+    _make_edits("ds")
+
+    log = store_dir / "ds.log"
+    assert len(log.read_bytes().splitlines()) == 5
+    warm = store.get_dataset("ds")
+    store._CACHE.clear()
+    cold, revision = store.get_dataset_with_revision("ds")
+
+    assert revision == 6
+    assert cold["goals"] == {"monthly_budget": 900.0}
+    assert cold["transactions"].to_records() == warm["transactions"].to_records()
+    _assert_matches_rebuild(cold)
+
+
+def test_a_torn_last_line_is_ignored(store_dir, monkeypatch):
+    # Keep the torn line in the log: a cold read would otherwise compact it away.
+    monkeypatch.setattr(store, "_schedule_compaction", lambda dataset_id: None)
+    store.save_dataset("ds", rebuild_dataset(_rows()))
+    _edit("ds", deletes=[_position("ds", "c1")])
+    log = store_dir / "ds.log"
+    with log.open("ab") as handle:
+        handle.write(b'{"log": "torn", "rows": [{"tx_id": "x"')
+
+    store._CACHE.clear()
+    dataset, revision = store.get_dataset_with_revision("ds")
+    assert revision == 2
+    assert "c1" not in dataset["transactions"].column("tx_id").tolist()
+
+    # The next append starts on a fresh line after the torn one.
+    _edit("ds", deletes=[_position("ds", "c2")])
+    store._CACHE.clear()
+    dataset, revision = store.get_dataset_with_revision("ds")
+    assert revision == 3
+    assert not {"c1", "c2"} & set(dataset["transactions"].column("tx_id").tolist())
+
+
+def _wait_for_compaction() -> None:
+    if store._compactor is not None:
+        store._compactor.submit(lambda: None).result()
+
+
+def _compaction_keeps_data(store_dir, monkeypatch, **limits) -> None:
+    for name, value in limits.items():
+        monkeypatch.setattr(store, name, value)
+    store.save_dataset("ds", rebuild_dataset(_rows()))
+    log = store_dir / "ds.log"
+
+    _edit("ds", deletes=[_position("ds", "c1")])
+    _wait_for_compaction()
+    assert log.exists()
+    before = store.get_dataset("ds")
+
+    _edit("ds", deletes=[_position("ds", "c2")])
+    expected = store.get_dataset("ds")["transactions"].to_records()
+    _wait_for_compaction()
+    assert not log.exists()
+
+    store._CACHE.clear()
+    dataset, revision = store.get_dataset_with_revision("ds")
+    assert revision == 3
+    assert dataset["transactions"].to_records() == expected
+    assert len(expected) == len(before["transactions"]) - 1
+    _assert_matches_rebuild(dataset)
+
+
+def test_compaction_triggers_at_the_record_limit(store_dir, monkeypatch):
+    _compaction_keeps_data(store_dir, monkeypatch, LOG_MAX_RECORDS=2)
+
+
+def test_compaction_triggers_at_the_byte_limit(store_dir, monkeypatch):
+    store.save_dataset("probe", rebuild_dataset(_rows()))
+    _edit("probe", deletes=[_position("probe", "c1")])
+    record_size = (store_dir / "probe.log").stat().st_size
+    _compaction_keeps_data(store_dir, monkeypatch, LOG_MAX_BYTES=record_size + 1)
+
+
+def test_cached_dataset_picks_up_records_appended_elsewhere(store_dir):
+    store.save_dataset("ds", rebuild_dataset(_rows()))
+    stale = store._CACHE["ds"]
+    # Another process appends a record; this process still caches the old copy.
+    _edit("ds", deletes=[_position("ds", "c1")])
+    store._CACHE["ds"] = stale
+
+    dataset, revision = store.get_dataset_with_revision("ds")
+    assert revision == 2
+    assert "c1" not in dataset["transactions"].column("tx_id").tolist()
+    assert store._CACHE["ds"].log_records == 1
+
+
+def test_a_cold_read_folds_the_log_into_the_snapshot(store_dir):
+    store.save_dataset("ds", rebuild_dataset(_rows()))
+    _make_edits("ds")
+    warm = store.get_dataset("ds")
+
+    store._CACHE.clear()
+    cold, revision = store.get_dataset_with_revision("ds")
+    _wait_for_compaction()
+    assert not (store_dir / "ds.log").exists()
+
+    store._CACHE.clear()
+    dataset, compacted_revision = store.get_dataset_with_revision("ds")
+    assert revision == compacted_revision == 6
+    assert store._CACHE["ds"].log_records == 0
+    assert dataset["transactions"].to_records() == cold["transactions"].to_records() == warm["transactions"].to_records()
+    assert dataset["goals"] == {"monthly_budget": 900.0}
+
+
+def test_runs_of_appends_replay_like_the_edits_that_wrote_them(store_dir, monkeypatch):
+    monkeypatch.setattr(store, "_schedule_compaction", lambda dataset_id: None)
+    store.save_dataset("ds", rebuild_dataset(_rows()))
+    for number in range(3):
+        _edit("ds", appends=[{"tx_id": f"a{number}", "date": f"2024-07-1{number}", "description": "Coffee", "merchant": "Corner Cafe", "amount": -4.5}])
+    position = _position("ds", "a1")
+    _edit("ds", updates={position: {**store.get_dataset("ds")["transactions"][position], "amount": -6.0}})
+    for number in range(3, 5):
+        _edit("ds", appends=[{"tx_id": f"a{number}", "date": f"2024-07-1{number}", "description": "Coffee", "merchant": "Corner Cafe", "amount": -4.5}])
+    _edit("ds", deletes=[_position("ds", "a0")])
+    warm = store.get_dataset("ds")
+
+    store._CACHE.clear()
+    cold, revision = store.get_dataset_with_revision("ds")
+    assert revision == 8
+    assert cold["transactions"].to_records() == warm["transactions"].to_records()
+    _assert_matches_rebuild(cold)
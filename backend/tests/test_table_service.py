@@ -0,0 +1,70 @@
+import random
+
+import numpy as np
+
+from services.table_service import TransactionTable
+
+
+def _rows(count: int, rng: random.Random) -> list[dict]:
+    return [
+        {"tx_id": f"t{rng.randrange(count)}", "date": f"2024-01-{rng.randint(10, 28)}", "merchant": "M", "amount": 1.0}
+        for _ in range(count)
+    ]
+
+
+def _brute_force(table: TransactionTable, tx_ids: list[str]) -> dict[str, list[int]]:
+    found: dict[str, list[int]] = {}
+    for position, tx_id in enumerate(table.column("tx_id").tolist()):
+        if tx_id in tx_ids:
+            found.setdefault(tx_id, []).append(position)
+    return found
+
+
+def test_tx_id_index_survives_edits_and_storage():
+    rng = random.Random(7)
+    table = TransactionTable.from_arrays(TransactionTable.from_records(_rows(200, rng)).to_arrays())
+    for _ in range(20):
+        positions = rng.sample(range(len(table)), 6)
+        changes = TransactionTable.from_records(_rows(5, rng))
+        table = table.edit(changes, positions[:2], positions[2:])
+        wanted = [f"t{number}" for number in range(0, 220, 3)]
+        assert table.tx_id_positions(wanted) == _brute_force(table, wanted)
+
+    rebuilt = TransactionTable.from_records(table.to_records())
+    np.testing.assert_array_equal(
+        table.column("tx_id")[table.tx_id_index], rebuilt.column("tx_id")[rebuilt.tx_id_index]
+    )
+
+
+def _assert_indexes_match_fresh(table: TransactionTable) -> None:
+    fresh = TransactionTable.from_records(table.to_records())
+    np.testing.assert_array_equal(table.date_index, fresh.date_index)
+    assert table.category_index.keys() == fresh.category_index.keys()
+    for category, positions in fresh.category_index.items():
+        np.testing.assert_array_equal(table.category_index[category], positions)
+    np.testing.assert_array_equal(table.tx_id_index, fresh.tx_id_index)
+
+
+def _unique_rows(prefix: str, count: int, rng: random.Random) -> list[dict]:
+    categories = ["Food", "Transport", "Bills", "Shopping"]
+    return [
+        {
+            "tx_id": f"{prefix}{number:06d}",
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "category": rng.choice(categories),
+            "amount": 1.0,
+        }
+        for number in range(count)
+    ]
+
+
+def test_large_batch_patches_indexes_like_a_fresh_build():
+    rng = random.Random(3)
+    table = TransactionTable.from_arrays(TransactionTable.from_records(_unique_rows("a", 20_000, rng)).to_arrays())
+    table.tx_id_index
+    # 500 rows are patched in; 5,000 rows are past the rebuild threshold.
+    for batch, count in (("b", 500), ("c", 5_000)):
+        positions = rng.sample(range(len(table)), 300)
+        changes = TransactionTable.from_records(_unique_rows(batch, count, rng))
+        table = table.edit(changes, positions[:100], positions[100:])
+        _assert_indexes_match_fresh(table)
@@ -0,0 +1,40 @@
+import store
+from services.dataset_service import rebuild_dataset
+
+TRANSACTION = {"date": "2024-02-01", "description": "Lunch", "merchant": "Corner Cafe", "amount": 12.5}
+
+
+def _seed(dataset_id: str = "ds") -> None:
+    store.save_dataset(dataset_id, rebuild_dataset([{**TRANSACTION, "tx_id": "a1"}]))
+
+
+def test_single_add_rejects_an_existing_tx_id(client):
+    _seed()
+    response = client.post("/api/datasets/ds/transactions", json={**TRANSACTION, "tx_id": "a1"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "A transaction with this tx_id already exists."}
+
+    assert client.post("/api/datasets/ds/transactions", json={**TRANSACTION, "tx_id": "a2"}).status_code == 200
+    assert client.post("/api/datasets/ds/transactions", json=TRANSACTION).status_code == 200
+    assert len(store.get_dataset("ds")["transactions"]) == 3
+
+
+def test_batch_rejects_existing_and_repeated_tx_ids(client):
+    _seed()
+    url = "/api/datasets/ds/transactions/batch"
+    existing = client.post(url, json={"operations": [{"op": "add", "transaction": {**TRANSACTION, "tx_id": "a1"}}]})
+    assert existing.status_code == 400
+    assert existing.get_json()["errors"] == [{"index": 0, "error": "A transaction with this tx_id already exists."}]
+
+    repeated = client.post(
+        url,
+        json={
+            "operations": [
+                {"op": "add", "transaction": {**TRANSACTION, "tx_id": "n1"}},
+                {"op": "add", "transaction": {**TRANSACTION, "tx_id": "n1"}},
+            ]
+        },
+    )
+    assert repeated.status_code == 400
+    assert repeated.get_json()["errors"] == [{"index": 1, "error": "tx_id appears more than once in the batch."}]
+    assert store.get_dataset("ds")["transactions"].column("tx_id").tolist() == ["a1"]
@@ -59,6 +59,19 @@ export const addTransaction = async (datasetId, transaction) => {
   }
 }
 
+export const addTransactions = async (datasetId, transactions) => {
+  const payload = { operations: transactions.map((transaction) => ({ op: 'add', transaction })) }
+  try {
+    const response = await client.post(`/datasets/${datasetId}/transactions/batch`, payload)
+    return response.data
+  } catch (error) {
+    if (shouldTryLocalFallback(error)) {
+      return fallbackRequest('post', `/datasets/${datasetId}/transactions/batch`, payload)
+    }
+    throw error
+  }
+}
+
 export const fetchTransactions = async (datasetId) => {
   const response = await client.get(`/datasets/${datasetId}/transactions`)
   return response.data
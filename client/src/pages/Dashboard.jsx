@@ -17,7 +17,7 @@ import SummaryCards from '../components/SummaryCards'
 import CategoryChart from '../components/CategoryChart'
 import UploadCard from '../components/UploadCard'
 import {
-  addTransaction,
+  addTransactions,
   createManualDataset,
   deleteTransaction,
   fetchSummary,
@@ -424,9 +424,7 @@ function Dashboard() {
     }
 
     try {
-      for (const transaction of newTransactions) {
-        await addTransaction(datasetId, transaction)
-      }
+      await addTransactions(datasetId, newTransactions)
       return datasetId
     } catch (err) {
       if (err.response?.status === 404) {
@@ -2,6 +2,7 @@ import { useCallback, useEffect, useMemo, useState } from 'react'
 import SubscriptionsTable from '../components/SubscriptionsTable'
 import {
   addTransaction,
+  addTransactions,
   createManualDataset,
   deleteTransaction,
   fetchCalendarEvents,
@@ -150,8 +151,8 @@ function Subscriptions() {
       return result.dataset_id
     }
 
-    for (const transaction of transactions) {
-      await addTransaction(datasetId, transaction)
+    if (transactions.length) {
+      await addTransactions(datasetId, transactions)
     }
 
     return datasetId